@@ -0,0 +1,154 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.province import DBProvince
+from .coherence import PROVINCES, read_cache_version
+
+
+@dataclass(frozen=True)
+class ProvinceEntry:
+    id: int
+    province_name: str
+    is_secondary: bool
+
+    @classmethod
+    def from_db(cls, province: DBProvince) -> "ProvinceEntry":
+        return cls(
+            id=province.id,
+            province_name=province.province_name,
+            is_secondary=province.is_secondary,
+        )
+
+
+# By id, by name, and every entry ordered by id for paging.
+_Index = Tuple[Dict[int, ProvinceEntry], Dict[str, ProvinceEntry], Tuple[ProvinceEntry, ...]]
+
+
+def _build_index(by_id: Dict[int, ProvinceEntry], by_name: Dict[str, ProvinceEntry]) -> _Index:
+    return by_id, by_name, tuple(sorted(by_id.values(), key=lambda e: e.id))
+
+
+class ProvinceCatalog:
+    """Process-local snapshot of the provinces table, indexed by id and name.
+
+    Writers replace the whole index tuple in one assignment, so readers always
+    see a consistent snapshot. Once loaded, the catalog is authoritative: a
+    lookup that misses means the province does not exist.
+
+    ``version`` counts local changes and keys this process's derived caches;
+    ``shared_version`` is the provinces row of cache_versions the snapshot
+    reflects, the same on every worker and across restarts, and feeds the ETag.
+    """
+
+    def __init__(self):
+        self._index: Optional[_Index] = None
+        self.version = 0
+        self.shared_version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._index is not None
+
+    @property
+    def etag(self) -> Optional[str]:
+        if self._index is None or self.shared_version is None:
+            return None
+        return f'W/"provinces-{self.shared_version}"'
+
+    async def load(self, session: AsyncSession) -> None:
+        # Read the version first: a write landing in between then only makes
+        # the tag older than the rows, which the next coherence check corrects.
+        shared_version = await read_cache_version(session, PROVINCES)
+        result = await session.exec(select(DBProvince))
+        entries = [ProvinceEntry.from_db(p) for p in result.all()]
+        self._index = _build_index(
+            {e.id: e for e in entries},
+            {e.province_name: e for e in entries},
+        )
+        self.shared_version = shared_version
+        self.loads += 1
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        if self._index is None:
+            await self.load(session)
+
+    def invalidate(self) -> None:
+        self._index = None
+        self.shared_version = None
+        self.version += 1
+
+    def get(self, province_id: int) -> Optional[ProvinceEntry]:
+        entry = self._index[0].get(province_id) if self._index else None
+        self._count(entry)
+        return entry
+
+    def get_by_name(self, province_name: str) -> Optional[ProvinceEntry]:
+        entry = self._index[1].get(province_name) if self._index else None
+        self._count(entry)
+        return entry
+
+    def all(self) -> Tuple[ProvinceEntry, ...]:
+        """Every entry, ordered by id."""
+        if self._index is None:
+            self.misses += 1
+            return ()
+        self.hits += 1
+        return self._index[2]
+
+    def put(self, province: DBProvince, shared_version: int) -> ProvinceEntry:
+        """Apply a committed write whose bump of the provinces version returned shared_version."""
+        entry = ProvinceEntry.from_db(province)
+        if not self._advance(shared_version):
+            return entry
+        by_id, by_name = dict(self._index[0]), dict(self._index[1])
+        previous = by_id.get(entry.id)
+        if previous is not None:
+            by_name.pop(previous.province_name, None)
+        by_id[entry.id] = entry
+        by_name[entry.province_name] = entry
+        self._index = _build_index(by_id, by_name)
+        return entry
+
+    def remove(self, province_id: int, shared_version: int) -> None:
+        if not self._advance(shared_version):
+            return
+        by_id, by_name = dict(self._index[0]), dict(self._index[1])
+        previous = by_id.pop(province_id, None)
+        if previous is not None:
+            by_name.pop(previous.province_name, None)
+        self._index = _build_index(by_id, by_name)
+
+    def _advance(self, shared_version: int) -> bool:
+        """Move to shared_version, or drop the snapshot if it missed another worker's write."""
+        if self._index is None or self.shared_version != shared_version - 1:
+            self.invalidate()
+            return False
+        self.version += 1
+        self.shared_version = shared_version
+        return True
+
+    def _count(self, entry: Optional[ProvinceEntry]) -> None:
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "size": len(self._index[0]) if self._index else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "version": self.version,
+            "shared_version": self.shared_version,
+        }
+
+
+province_catalog = ProvinceCatalog()
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.cache_version import DBCacheVersion
+from . import config
+
+settings = config.settings
+logger = logging.getLogger(__name__)
+
+PROVINCES = "provinces"
+PRINCIPALS = "principals"
+REVOCATIONS = "revocations"
+
+_versions = DBCacheVersion.__table__
+
+
+async def bump_cache_version(session: AsyncSession, name: str) -> int:
+    """Increment name's version inside the caller's transaction and return it."""
+    statement = (
+        update(_versions)
+        .where(_versions.c.name == name)
+        .values(version=_versions.c.version + 1)
+        .returning(_versions.c.version)
+    )
+    version = (await session.exec(statement)).scalar_one_or_none()
+    if version is not None:
+        return version
+    try:
+        async with session.begin_nested():
+            await session.exec(insert(_versions).values(name=name, version=1))
+        return 1
+    except IntegrityError:
+        # Another worker created the row first.
+        return (await session.exec(statement)).scalar_one()
+
+
+async def read_cache_version(session: AsyncSession, name: str) -> int:
+    """Return name's current version, 0 if it was never bumped."""
+    statement = select(_versions.c.version).where(_versions.c.name == name)
+    return (await session.exec(statement)).scalar_one_or_none() or 0
+
+
+class CacheCoherence:
+    """Keeps this worker's in-process caches in step with writes made by other workers.
+
+    Writers bump a row in cache_versions alongside their change. A background
+    task reads the handful of rows every ``interval`` seconds and runs the
+    invalidation handler of any dataset whose version moved, so requests never
+    pay for the check; another worker's write is visible here within one
+    interval. Versions this worker bumped itself are passed to ``observe`` so
+    its already write-through caches are not thrown away.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._handlers: Dict[str, Callable[[AsyncSession], Optional[Awaitable[None]]]] = {}
+        self._seen: Optional[Dict[str, int]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._session_factory = None
+        self.invalidations = 0
+
+    def register(self, name: str, handler: Callable[[AsyncSession], Optional[Awaitable[None]]]) -> None:
+        self._handlers[name] = handler
+
+    def observe(self, name: str, version: int) -> None:
+        """Record a version bumped by this worker once its transaction committed."""
+        if self._seen is not None and self._seen.get(name, 0) == version - 1:
+            self._seen[name] = version
+
+    async def check(self, session: AsyncSession) -> List[str]:
+        """Invalidate every cache whose version changed; the first call only takes a baseline."""
+        rows = (await session.exec(select(_versions.c.name, _versions.c.version))).all()
+        current = dict(rows)
+        if self._seen is None:
+            self._seen = current
+            return []
+        changed = [name for name, version in current.items() if self._seen.get(name) != version]
+        self._seen = current
+        for name in changed:
+            handler = self._handlers.get(name)
+            if handler is None:
+                continue
+            result = handler(session)
+            if result is not None:
+                await result
+            self.invalidations += 1
+        return changed
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with self._session_factory() as session:
+                    await self.check(session)
+            except Exception:
+                logger.exception("Cache coherence check failed")
+
+    async def start(self, session_factory) -> None:
+        self._session_factory = session_factory
+        async with session_factory() as session:
+            await self.check(session)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._seen = None
+
+    def stats(self) -> dict:
+        return {"invalidations": self.invalidations}
+
+
+cache_coherence = config.Lazy(
+    lambda: CacheCoherence(settings.CACHE_COHERENCE_INTERVAL_MS / 1000)
+)
@@ -1,5 +1,18 @@
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+
+class TaxRules(BaseModel):
+    """Tax-reduction rules; set as JSON in the TAX_RULES environment variable."""
+
+    primary_rate: float = 0.1
+    secondary_rate: float = 0.2
+    province_overrides: Dict[str, float] = {}
+    max_rate: float = 1.0
+    max_reduction_amount: Optional[float] = None
+
 
 class Settings(BaseSettings):
     SQLDB_URL: str
@@ -7,12 +20,120 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 5 * 60
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 7 * 24 * 60
 
+    SQLDB_ECHO: bool = False
+    SQLDB_POOL_SIZE: int = 5
+    SQLDB_MAX_OVERFLOW: int = 10
+    SQLDB_POOL_PRE_PING: bool = True
+    SQLDB_POOL_TIMEOUT: float = 30.0
+    SQLDB_POOL_RECYCLE: int = -1
+    SQLDB_CONNECT_TIMEOUT: float = 30.0
+
+    # Budgets are keyed by "METHOD /route/template", e.g. "GET /users/{user_id}".
+    SQL_QUERY_BUDGETS: Dict[str, int] = {}
+    SQL_QUERY_BUDGET_DEFAULT: Optional[int] = None
+    SQL_QUERY_BUDGET_MODE: str = "log"
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10
+
+    FAST_JSON_RESPONSES: bool = False
+    METRICS_ENABLED: bool = True
+
+    PROVINCE_CACHE_MAX_AGE: int = 60
+    PROVINCE_IMPORT_BATCH_SIZE: int = 500
+    PROVINCE_IMPORT_MAX_ERRORS: int = 100
+    EXPORT_BATCH_SIZE: int = 1000
+
+    TAX_RULES: TaxRules = TaxRules()
+
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0
+
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_LIMIT_IP_BURST: int = 20
+    LOGIN_RATE_LIMIT_IP_PER_MINUTE: float = 20
+    LOGIN_RATE_LIMIT_IDENTIFIER_BURST: int = 5
+    LOGIN_RATE_LIMIT_IDENTIFIER_PER_MINUTE: float = 5
+    LOGIN_RATE_LIMIT_MAX_KEYS: int = 100_000
+
+    LAST_LOGIN_FLUSH_INTERVAL_MS: int = 500
+    LAST_LOGIN_FLUSH_MAX_ENTRIES: int = 1000
+
+    CACHE_COHERENCE_INTERVAL_MS: int = 1000
+
+    PASSWORD_HASHER_BACKEND: str = "thread"
+    PASSWORD_HASHER_MAX_WORKERS: int = 4
+
     model_config = {
         "env_file": ".env",
         "validate_assignment": True,
         "extra": "allow",
     }
 
+_configured: Optional[Settings] = None
+
+
 @lru_cache()
 def get_settings():
-    return Settings()
+    return _configured if _configured is not None else Settings()
+
+
+_lazy_objects: List["Lazy"] = []
+_generation = 0
+
+
+def configure(settings: Optional[Settings]) -> None:
+    """Make get_settings() return settings instead of reading the environment.
+
+    Every Lazy singleton is dropped so its next use rebuilds it from settings.
+    """
+    global _configured, _generation
+    _configured = settings
+    _generation += 1
+    get_settings.cache_clear()
+    for lazy in _lazy_objects:
+        object.__setattr__(lazy, "_instance", None)
+
+
+def generation() -> int:
+    """Bumped by configure(); lets derived caches notice that settings changed."""
+    return _generation
+
+
+class LazySettings:
+    """Module-level stand-in for get_settings() that resolves on attribute access.
+
+    Modules bind ``settings = config.settings`` so importing them never reads
+    the environment; the real Settings is built the first time a value is used.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+
+settings = LazySettings()
+
+
+class Lazy:
+    """Proxy for a module-level singleton built from settings on first use."""
+
+    __slots__ = ("_factory", "_instance")
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        _lazy_objects.append(self)
+
+    def _resolve(self):
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            instance = object.__getattribute__(self, "_factory")()
+            object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._resolve(), name, value)
+
+    def __len__(self):
+        return len(self._resolve())
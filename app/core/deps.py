@@ -4,36 +4,54 @@ import jwt
 from typing import Annotated
 from app import models
 from . import config, security
+from .principals import Principal, principal_cache
+from .revocation import revoked_tokens
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
-settings = config.get_settings()
+settings = config.settings
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    session: Annotated[models.AsyncSession, Depends(models.get_session)],
-) -> models.DBUser:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def get_token_payload(
+    token: Annotated[str, Depends(oauth2_scheme)],
+) -> dict:
+    """Decode and validate the bearer access token, rejecting revoked ones."""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
-        user_id_str = payload.get("sub")
-        if user_id_str is None:
-            raise credentials_exception
-        user_id = int(user_id_str)
+        int(payload["sub"])
     except Exception:
-        raise credentials_exception
+        raise _credentials_exception()
+    if payload.get("scope") != "access":
+        raise _credentials_exception()
+    jti = payload.get("jti")
+    if jti and revoked_tokens.is_revoked(jti):
+        raise _credentials_exception()
+    return payload
 
-    user = await session.get(models.DBUser, user_id)
-    if not user:
-        raise credentials_exception
-    return user
+async def get_current_user(
+    payload: Annotated[dict, Depends(get_token_payload)],
+    session: Annotated[models.AsyncSession, Depends(models.get_session)],
+) -> Principal:
+    user_id = int(payload["sub"])
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = await session.get(models.DBUser, user_id)
+        if not user:
+            raise _credentials_exception()
+        principal = Principal.from_user(user)
+        principal_cache.put(principal)
+    return principal
 
 async def get_current_active_user(
-    current_user: Annotated[models.DBUser, Depends(get_current_user)]
-) -> models.DBUser:
+    current_user: Annotated[Principal, Depends(get_current_user)]
+) -> Principal:
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 class RoleChecker:
@@ -42,7 +60,7 @@ class RoleChecker:
 
     def __call__(
         self,
-        user: Annotated[models.DBUser, Depends(get_current_active_user)]
+        user: Annotated[Principal, Depends(get_current_active_user)]
     ):
         if any(role in self.allowed_roles for role in user.roles):
             return
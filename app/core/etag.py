@@ -0,0 +1,42 @@
+from fastapi import Depends, HTTPException, Request, Response
+
+from app import models
+from . import config
+from .catalog import province_catalog
+
+settings = config.settings
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against etag (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = _opaque(etag)
+    return any(_opaque(tag) == current for tag in if_none_match.split(","))
+
+
+async def province_catalog_etag(
+    request: Request,
+    response: Response,
+    session: models.AsyncSession = Depends(models.get_session),
+) -> None:
+    """Answer 304 for an unchanged province catalog; a warm catalog needs no DB work.
+
+    The tag is the shared provinces version, so it validates on any worker.
+    """
+    await province_catalog.ensure_loaded(session)
+    etag = province_catalog.etag
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.PROVINCE_CACHE_MAX_AGE}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
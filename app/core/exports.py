@@ -0,0 +1,64 @@
+import csv
+import io
+from typing import AsyncIterator, Optional, Sequence
+
+from pydantic_core import to_json
+from sqlalchemy import Column, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+EXPORT_FORMATS = {"ndjson": NDJSON_MEDIA_TYPE, "csv": CSV_MEDIA_TYPE}
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return to_json(value).decode("utf-8")
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+async def stream_table(
+    bind: AsyncEngine,
+    columns: Sequence[Column],
+    fmt: str,
+    after_id: Optional[int] = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[bytes]:
+    """Yield a table as NDJSON or CSV, ordered by id and starting after after_id.
+
+    Rows come through a server-side cursor in batches of batch_size and each
+    batch is encoded and yielded before the next is fetched, so memory stays
+    flat however large the table is. The id column is always first, so a
+    client that loses the connection can resume from the last id it stored.
+    The stream opens its own session because the request's session is closed
+    before the response body is sent.
+    """
+    id_column = columns[0]
+    statement = select(*columns).order_by(id_column).execution_options(yield_per=batch_size)
+    if after_id is not None:
+        statement = statement.where(id_column > after_id)
+    names = [column.key for column in columns]
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        yield buffer.getvalue().encode("utf-8")
+
+    async with AsyncSession(bind) as session:
+        result = await session.stream(statement)
+        async for partition in result.partitions():
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([_csv_value(value) for value in row] for row in partition)
+                yield buffer.getvalue().encode("utf-8")
+            else:
+                yield b"".join(
+                    to_json(dict(zip(names, row))) + b"\n" for row in partition
+                )
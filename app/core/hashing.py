@@ -0,0 +1,91 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+from . import config
+from .metrics import password_hash_duration
+
+settings = config.settings
+
+
+def _checkpw(plain_password: bytes, hashed_password: bytes) -> bool:
+    return bcrypt.checkpw(plain_password, hashed_password)
+
+
+def _hashpw(plain_password: bytes) -> bytes:
+    return bcrypt.hashpw(plain_password, bcrypt.gensalt())
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded worker pool so it never blocks the event loop."""
+
+    def __init__(self, backend: str = "thread", max_workers: int = 4):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown password hasher backend: {backend}")
+        self.backend = backend
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.backend == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.max_workers)
+
+    async def _run(self, operation: str, func, *args):
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            password_hash_duration.observe(time.perf_counter() - start, operation)
+            self.in_flight -= 1
+            self.completed += 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(
+            "verify", _checkpw, plain_password.encode("utf-8"), hashed_password.encode("utf-8")
+        )
+
+    async def hash(self, plain_password: str) -> str:
+        hashed = await self._run("hash", _hashpw, plain_password.encode("utf-8"))
+        return hashed.decode("utf-8")
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "max_workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+hasher = config.Lazy(lambda: PasswordHasher(
+    backend=settings.PASSWORD_HASHER_BACKEND,
+    max_workers=settings.PASSWORD_HASHER_MAX_WORKERS,
+))
@@ -0,0 +1,136 @@
+import asyncio
+import datetime
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.user_model import DBUser
+from . import config
+
+settings = config.settings
+logger = logging.getLogger(__name__)
+
+_users = DBUser.__table__
+
+
+class LastLoginBuffer:
+    """Write-behind buffer for users.last_login_date.
+
+    Logins record their timestamp here instead of committing it; a background
+    task writes every pending timestamp in one executemany UPDATE once
+    ``interval`` seconds pass or ``max_entries`` users are waiting. Reads of
+    last_login_date may lag by up to one flush interval.
+    """
+
+    def __init__(self, interval: float, max_entries: int):
+        self.interval = interval
+        self.max_entries = max_entries
+        self._pending: Dict[int, datetime.datetime] = {}
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._session_factory = None
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+
+    def record(self, user_id: int, logged_in_at: datetime.datetime) -> None:
+        self._pending[user_id] = logged_in_at
+        if len(self._pending) >= self.max_entries:
+            self._full.set()
+
+    def pending(self, user_id: int) -> Optional[datetime.datetime]:
+        return self._pending.get(user_id)
+
+    async def flush(self, session: Optional[AsyncSession] = None) -> int:
+        """Write all pending timestamps; returns the number of users updated."""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        self._full.clear()
+        params = [{"match_id": user_id, "new_login": ts} for user_id, ts in batch.items()]
+        statement = (
+            update(_users)
+            .where(_users.c.id == bindparam("match_id"))
+            .values(last_login_date=bindparam("new_login"))
+        )
+        try:
+            if session is not None:
+                await self._write(session, statement, params)
+            else:
+                async with self._session_factory() as own_session:
+                    await self._write(own_session, statement, params)
+        except BaseException:
+            # Typically "database is locked" (or cancellation at shutdown): keep
+            # the batch for the next flush so those logins are not lost.
+            self._restore(batch)
+            raise
+        self.flushes += 1
+        self.flushed_rows += len(params)
+        return len(params)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush last_login_date updates")
+
+    def start(self, session_factory) -> None:
+        self._session_factory = session_factory
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the flusher and drain whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session_factory is not None:
+            await self.flush()
+
+    @staticmethod
+    async def _write(session: AsyncSession, statement, params) -> None:
+        try:
+            await session.exec(statement, params=params)
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+
+    def _restore(self, batch: Dict[int, datetime.datetime]) -> None:
+        """Merge a failed batch back, keeping logins recorded while it was in flight."""
+        for user_id, logged_in_at in batch.items():
+            newer = self._pending.get(user_id)
+            if newer is None or newer < logged_in_at:
+                self._pending[user_id] = logged_in_at
+        self.failed_flushes += 1
+        if len(self._pending) >= self.max_entries:
+            self._full.set()
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._full.clear()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+last_login_buffer = config.Lazy(lambda: LastLoginBuffer(
+    settings.LAST_LOGIN_FLUSH_INTERVAL_MS / 1000,
+    settings.LAST_LOGIN_FLUSH_MAX_ENTRIES,
+))
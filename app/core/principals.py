@@ -0,0 +1,72 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+from . import config
+
+settings = config.settings
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The slice of a user that authentication and role checks need."""
+
+    id: int
+    roles: Tuple[str, ...]
+    is_active: bool = True
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(id=user.id, roles=tuple(user.roles or ()), is_active=user.is_active)
+
+    def has_roles(self, roles: Iterable[str]) -> bool:
+        return any(role in self.roles for role in roles)
+
+
+class PrincipalCache:
+    """Bounded LRU of principals keyed by user id, each entry expiring after ttl seconds."""
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[float, Principal]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, principal = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return principal
+
+    def put(self, principal: Principal) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[principal.id] = (time.monotonic() + self.ttl, principal)
+        self._entries.move_to_end(principal.id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+principal_cache = config.Lazy(lambda: PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+))
@@ -0,0 +1,134 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.province import (
+    DBProvince, ProvinceCreate, ProvinceImportError, ProvinceImportResult
+)
+
+CSV_TYPES = {"text/csv", "application/csv"}
+JSONL_TYPES = {"application/x-ndjson", "application/jsonl", "application/x-jsonlines"}
+
+_provinces = DBProvince.__table__
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """Split a byte stream into numbered text lines without buffering the body."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    number = 0
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            number += 1
+            yield number, line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield number + 1, pending.rstrip("\r")
+
+
+async def iter_records(
+    chunks: AsyncIterator[bytes], content_type: str
+) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (line, raw record) pairs from a CSV or JSONL body.
+
+    CSV records must fit on one line; the first line is the header.
+    """
+    header = None
+    async for number, line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        if content_type in CSV_TYPES:
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            yield number, dict(zip(header, values))
+        else:
+            try:
+                yield number, json.loads(line)
+            except ValueError as exc:
+                yield number, exc
+
+
+async def _flush(session: AsyncSession, batch: Dict[str, dict], result: ProvinceImportResult):
+    if not batch:
+        return
+    existing = set(
+        (await session.exec(
+            select(_provinces.c.province_name).where(_provinces.c.province_name.in_(batch))
+        )).scalars()
+    )
+    inserts = [row for name, row in batch.items() if name not in existing]
+    updates = [
+        {"match_name": name, "new_is_secondary": row["is_secondary"]}
+        for name, row in batch.items() if name in existing
+    ]
+    if inserts:
+        await session.exec(insert(_provinces), params=inserts)
+    if updates:
+        await session.exec(
+            update(_provinces)
+            .where(_provinces.c.province_name == bindparam("match_name"))
+            .values(is_secondary=bindparam("new_is_secondary")),
+            params=updates,
+        )
+    await session.commit()
+    result.inserted += len(inserts)
+    result.updated += len(updates)
+
+
+async def import_provinces(
+    session: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    batch_size: int = 500,
+    max_errors: int = 100,
+    result: Optional[ProvinceImportResult] = None,
+) -> ProvinceImportResult:
+    """Validate streamed rows with ProvinceCreate and upsert them by province_name.
+
+    Each batch costs one SELECT, at most one executemany INSERT and one
+    executemany UPDATE, committed together. Counts accumulate in result as
+    batches commit, so a caller that passes one in still sees them if the
+    stream fails part way.
+    """
+    if result is None:
+        result = ProvinceImportResult()
+    batch: Dict[str, dict] = {}
+
+    def reject(line: int, detail: str) -> None:
+        result.rejected += 1
+        if len(result.errors) < max_errors:
+            result.errors.append(ProvinceImportError(line=line, detail=detail))
+
+    async for line, record in iter_records(chunks, content_type):
+        if isinstance(record, Exception):
+            reject(line, f"Invalid JSON: {record}")
+            continue
+        try:
+            province = ProvinceCreate.model_validate(record)
+        except ValidationError as exc:
+            reject(line, "; ".join(
+                f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()
+            ))
+            continue
+
+        if province.province_name in batch:
+            # A repeat within the batch is applied as an update of the earlier row.
+            result.updated += 1
+        batch[province.province_name] = province.model_dump()
+        if len(batch) >= batch_size:
+            await _flush(session, batch, result)
+            batch = {}
+
+    await _flush(session, batch, result)
+    # Core DML bypasses the identity map; drop any province objects it made stale.
+    session.expire_all()
+    return result
@@ -0,0 +1,129 @@
+"""Request-scoped SQL statement counting, query budgets and N+1 detection.
+
+A QueryCounter is stored in a context variable. One global listener on
+every Engine counts cursor executions while a counter is active. Outside a
+tracked scope the listener costs one ContextVar lookup.
+"""
+import collections
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import config
+
+logger = logging.getLogger(__name__)
+settings = config.settings
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in "raise" mode when a request issues more statements than its budget."""
+
+
+class QueryCounter:
+    def __init__(
+        self,
+        label: str = "",
+        budget: Optional[int] = None,
+        mode: str = "log",
+        n_plus_one_threshold: int = 0,
+    ):
+        self.label = label
+        self.budget = budget
+        self.mode = mode
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.count = 0
+        self.statements: collections.Counter = collections.Counter()
+        self._warned_budget = False
+
+    def record(self, statement: str) -> None:
+        self.count += 1
+        repeats = self.statements[statement] = self.statements[statement] + 1
+        if self.n_plus_one_threshold and repeats == self.n_plus_one_threshold:
+            logger.warning(
+                "Possible N+1 in %s: statement ran %d times: %s",
+                self.label, repeats, statement.splitlines()[0][:200],
+            )
+        if self.budget is not None and self.count > self.budget:
+            if self.mode == "raise":
+                raise QueryBudgetExceeded(
+                    f"{self.label} issued {self.count} SQL statements, budget is {self.budget}"
+                )
+            if not self._warned_budget:
+                self._warned_budget = True
+                logger.warning(
+                    "%s exceeded its SQL budget of %d statements", self.label, self.budget
+                )
+
+
+_current: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+
+def current_counter() -> Optional[QueryCounter]:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is not None:
+        counter.record(statement)
+
+
+def budget_for(route_label: str) -> Optional[int]:
+    return settings.SQL_QUERY_BUDGETS.get(route_label, settings.SQL_QUERY_BUDGET_DEFAULT)
+
+
+@contextmanager
+def track_request_queries(route_label: str) -> Iterator[QueryCounter]:
+    """Count a request's statements against its route budget.
+
+    An already active counter (an outer request scope or a test helper) is
+    reused so that nested sessions add to the same total.
+    """
+    counter = _current.get()
+    if counter is not None:
+        yield counter
+        return
+
+    counter = QueryCounter(
+        label=route_label,
+        budget=budget_for(route_label),
+        mode=settings.SQL_QUERY_BUDGET_MODE,
+        n_plus_one_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD,
+    )
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def count_queries(label: str = "", budget: Optional[int] = None, mode: str = "raise") -> Iterator[QueryCounter]:
+    """Count the statements issued inside the block."""
+    counter = QueryCounter(label=label, budget=budget, mode=mode)
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_query_count(expected: int) -> Iterator[QueryCounter]:
+    """Test helper: fail unless exactly expected statements run inside the block.
+
+        with assert_query_count(1):
+            await client.get("/provinces/")
+    """
+    with count_queries(label="assert_query_count") as counter:
+        yield counter
+    if counter.count != expected:
+        statements = "\n".join(f"  {n}x {s}" for s, n in counter.statements.items())
+        raise AssertionError(
+            f"Expected {expected} SQL statements, got {counter.count}:\n{statements}"
+        )
@@ -0,0 +1,107 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from app.models.identifiers import canonical_identifier
+from . import config
+
+settings = config.settings
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets with O(1) updates and LRU eviction past max_keys.
+
+    Evicting a key forgets its history, which only ever makes the limiter
+    more lenient for that key, never stricter.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, max_keys: int = 100_000):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def hit(self, key: str, now: Optional[float] = None) -> float:
+        """Take one token for key. Returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = self.capacity
+        else:
+            tokens, last = bucket
+            tokens = min(self.capacity, tokens + (now - last) * self.refill_per_second)
+            self._buckets.move_to_end(key)
+
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            retry_after = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            retry_after = (1 - tokens) / self.refill_per_second
+
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def reset(self) -> None:
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class LoginThrottle:
+    """Limits login attempts per client IP and per normalized identifier."""
+
+    def __init__(self, settings: config.Settings):
+        self.enabled = settings.LOGIN_RATE_LIMIT_ENABLED
+        self.by_ip = TokenBucketLimiter(
+            settings.LOGIN_RATE_LIMIT_IP_BURST,
+            settings.LOGIN_RATE_LIMIT_IP_PER_MINUTE / 60,
+            settings.LOGIN_RATE_LIMIT_MAX_KEYS,
+        )
+        self.by_identifier = TokenBucketLimiter(
+            settings.LOGIN_RATE_LIMIT_IDENTIFIER_BURST,
+            settings.LOGIN_RATE_LIMIT_IDENTIFIER_PER_MINUTE / 60,
+            settings.LOGIN_RATE_LIMIT_MAX_KEYS,
+        )
+        self.rejected = 0
+
+    def check(self, client_ip: str, identifier: str) -> float:
+        if not self.enabled:
+            return 0.0
+        retry_after = self.by_ip.hit(client_ip) or self.by_identifier.hit(identifier)
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+    def reset(self) -> None:
+        self.by_ip.reset()
+        self.by_identifier.reset()
+
+    def stats(self) -> dict:
+        return {
+            "ip_keys": len(self.by_ip),
+            "identifier_keys": len(self.by_identifier),
+            "rejected": self.rejected,
+        }
+
+
+login_throttle = config.Lazy(lambda: LoginThrottle(settings))
+
+
+def enforce_login_throttle(request: Request, identifier: str) -> None:
+    """Raise 429 with Retry-After before any password hashing or DB work."""
+    client_ip = request.client.host if request.client else "unknown"
+    # Same normalization as the lookup, so reformatting a phone number or
+    # changing case cannot buy a fresh bucket for the same account.
+    retry_after = login_throttle.check(client_ip, canonical_identifier(identifier))
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
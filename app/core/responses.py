@@ -0,0 +1,26 @@
+from typing import Any, Optional
+
+from fastapi import Response
+from pydantic_core import to_json
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered straight to bytes by pydantic-core's encoder.
+
+    Handlers build plain dicts in response-model field order and skip model
+    construction and response_model validation entirely. The output matches
+    what FastAPI produces for the same data through the response model.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def fast_json(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """Wrap content, carrying over headers set on the injected response."""
+    fast = FastJSONResponse(content)
+    if response is not None:
+        fast.headers.raw.extend(response.headers.raw)
+    return fast
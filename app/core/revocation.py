@@ -0,0 +1,102 @@
+import datetime
+import heapq
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.token_model import DBRefreshToken, DBRevokedToken
+
+
+def _utc_timestamp(value: datetime.datetime) -> float:
+    # SQLite hands datetimes back naive; everything stored here is UTC.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+class RevocationList:
+    """In-memory set of revoked token ids, each dropped once its token has expired.
+
+    Lookups are a dict membership test. Expired entries are evicted lazily
+    from a min-heap ordered by expiry, so pruning costs O(log n) per entry.
+    """
+
+    def __init__(self):
+        self._expiry: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def add(self, jti: str, expires_at: float) -> None:
+        if expires_at <= time.time():
+            return
+        self._expiry[jti] = expires_at
+        heapq.heappush(self._heap, (expires_at, jti))
+
+    def is_revoked(self, jti: str) -> bool:
+        if not self._expiry:
+            return False
+        self.prune()
+        return jti in self._expiry
+
+    def prune(self, now: float | None = None) -> None:
+        now = time.time() if now is None else now
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, jti = heapq.heappop(heap)
+            self._expiry.pop(jti, None)
+
+    def clear(self) -> None:
+        self._expiry.clear()
+        self._heap.clear()
+        self.loaded = False
+
+    async def load(self, session: AsyncSession) -> None:
+        """Rebuild from the database, deleting rows for tokens that have expired."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        await session.exec(delete(DBRevokedToken).where(DBRevokedToken.expires_at <= now))
+        await session.commit()
+        result = await session.exec(select(DBRevokedToken.jti, DBRevokedToken.expires_at))
+        self._expiry.clear()
+        self._heap.clear()
+        for jti, expires_at in result.all():
+            self.add(jti, _utc_timestamp(expires_at))
+        self.loaded = True
+
+    def stats(self) -> dict:
+        return {"size": len(self._expiry)}
+
+
+revoked_tokens = RevocationList()
+
+
+async def revoke_token(session: AsyncSession, payload: dict) -> None:
+    """Persist the revocation of a decoded token and, for refresh tokens, its family.
+
+    The caller commits; the in-memory list is updated only after that succeeds,
+    via apply_revocation.
+    """
+    jti = payload.get("jti")
+    if not jti:
+        return
+    now = datetime.datetime.now(datetime.timezone.utc)
+    expires_at = datetime.datetime.fromtimestamp(payload["exp"], datetime.timezone.utc)
+    await session.merge(DBRevokedToken(jti=jti, expires_at=expires_at, revoked_at=now))
+
+    if payload.get("scope") == "refresh":
+        family = select(DBRefreshToken.family_id).where(DBRefreshToken.jti == jti).scalar_subquery()
+        await session.exec(
+            update(DBRefreshToken)
+            .where(DBRefreshToken.family_id == family, DBRefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+        )
+
+
+def apply_revocation(payload: dict) -> None:
+    if payload.get("jti"):
+        revoked_tokens.add(payload["jti"], float(payload["exp"]))
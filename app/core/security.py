@@ -1,9 +1,10 @@
 import datetime
+import uuid
 import jwt
 from typing import Optional
 from . import config
 
-settings = config.get_settings()
+settings = config.settings
 ALGORITHM = "HS256"
 
 def create_access_token(data: dict, expires_delta: Optional[datetime.timedelta] = None) -> str:
@@ -14,6 +15,7 @@ def create_access_token(data: dict, expires_delta: Optional[datetime.timedelta]
     if sub is None:
         raise ValueError("Missing 'sub' claim in token data")
 
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     to_encode.update({
         "exp": expire,
         "iat": now,
@@ -27,6 +29,7 @@ def create_refresh_token(data: dict, expires_delta: Optional[datetime.timedelta]
     now = datetime.datetime.utcnow()
     expire = now + (expires_delta or datetime.timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES))
 
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     to_encode.update({
         "exp": expire,
         "iat": now,
@@ -0,0 +1,114 @@
+import math
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+from . import config
+from .catalog import ProvinceCatalog, province_catalog
+
+settings = config.settings
+
+_MISSING = math.nan
+
+
+class CompiledTaxRules:
+    """TaxRules flattened for O(1) lookups, with the rate cap already applied.
+
+    A province's rate is its name override if any, otherwise the category
+    default indexed by is_secondary.
+    """
+
+    def __init__(self, rules: config.TaxRules):
+        self.rules = rules
+        cap = rules.max_rate
+        self.category_rates = (min(rules.primary_rate, cap), min(rules.secondary_rate, cap))
+        self.overrides = {
+            name: min(rate, cap) for name, rate in rules.province_overrides.items()
+        }
+        self.max_reduction_amount = rules.max_reduction_amount
+
+    def rate_for(self, province) -> float:
+        rate = self.overrides.get(province.province_name)
+        if rate is None:
+            rate = self.category_rates[bool(province.is_secondary)]
+        return rate
+
+    def reduction_amount(self, rate: float, amount: float) -> float:
+        reduction = rate * amount
+        if self.max_reduction_amount is not None and reduction > self.max_reduction_amount:
+            return self.max_reduction_amount
+        return reduction
+
+
+tax_rules = config.Lazy(lambda: CompiledTaxRules(settings.TAX_RULES))
+
+
+class RateTable:
+    """Reduction rates in a flat array indexed by province id.
+
+    Unknown ids hold NaN, so a lookup is a bounds check and one array read.
+    """
+
+    def __init__(self, key: Tuple[int, int, int], rates: array, rules: CompiledTaxRules):
+        self.key = key
+        self.rates = rates
+        self.rules = rules
+
+    @classmethod
+    def build(cls, catalog: ProvinceCatalog, rules: CompiledTaxRules = tax_rules) -> "RateTable":
+        entries = catalog.all()
+        size = max((e.id for e in entries), default=-1) + 1
+        rates = array("d", [_MISSING]) * size
+        for entry in entries:
+            rates[entry.id] = rules.rate_for(entry)
+        return cls(_table_key(catalog), rates, rules)
+
+    def rate(self, province_id: int) -> Optional[float]:
+        if 0 <= province_id < len(self.rates):
+            rate = self.rates[province_id]
+            if rate == rate:
+                return rate
+        return None
+
+    def quote(
+        self, province_ids: Sequence[int], amounts: Sequence[float]
+    ) -> Tuple[List[Optional[float]], List[Optional[float]]]:
+        """Return (rates, reduction amounts) aligned with the inputs."""
+        rates = self.rates
+        size = len(rates)
+        looked_up = [rates[i] if 0 <= i < size else _MISSING for i in province_ids]
+        reductions = [r * a for r, a in zip(looked_up, amounts)]
+        cap = self.rules.max_reduction_amount
+        if cap is not None:
+            reductions = [cap if x > cap else x for x in reductions]
+        return (
+            [r if r == r else None for r in looked_up],
+            [x if x == x else None for x in reductions],
+        )
+
+
+_rate_table: Optional[RateTable] = None
+
+
+def _table_key(catalog: ProvinceCatalog) -> Tuple[int, int, int]:
+    # Reloads do not bump the version, so they are part of the key too; the
+    # settings generation covers tax rules replaced by config.configure().
+    return (catalog.version, catalog.loads, config.generation())
+
+
+def get_rate_table(catalog: ProvinceCatalog = province_catalog) -> RateTable:
+    """Return the rate table for the catalog's current version, rebuilding on change."""
+    global _rate_table
+    key = _table_key(catalog)
+    if _rate_table is None or _rate_table.key != key:
+        _rate_table = RateTable.build(catalog)
+    return _rate_table
+
+
+def province_rate(province) -> float:
+    """Rate for province from the compiled rate table.
+
+    Provinces the catalog does not hold yet, such as one written while the
+    catalog is unloaded, are rated from the rules directly.
+    """
+    rate = get_rate_table().rate(province.id)
+    return tax_rules.rate_for(province) if rate is None else rate
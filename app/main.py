@@ -1,28 +1,113 @@
+import json
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Optional
 
-from .models import init_db, close_db
-from .routers import router as user_router
-from .routers import router as province_router
-from .routers import router as authentication_router
+from fastapi import FastAPI, Request, Response
 
+from .core import config
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    await init_db()
-    yield
-    await close_db()
 
-app = FastAPI(
-    title="Travel API",
-    version="1.0.0",
-    lifespan=lifespan
-)
+def _cached_openapi(app: FastAPI):
+    """Serve the OpenAPI document from bytes rendered once, not re-encoded per request."""
+    body: Optional[bytes] = None
 
-app.include_router(user_router)
-app.include_router(province_router) 
-app.include_router(authentication_router) 
+    def render() -> bytes:
+        nonlocal body
+        if body is None:
+            body = json.dumps(app.openapi(), separators=(",", ":")).encode("utf-8")
+        return body
 
-@app.get("/")
-def read_root() -> dict:
-    return {"message": "Hello World"}
+    async def openapi(request: Request) -> Response:
+        return Response(render(), media_type="application/json")
+
+    app.router.routes = [
+        route for route in app.router.routes if getattr(route, "path", None) != app.openapi_url
+    ]
+    app.add_route(app.openapi_url, openapi, include_in_schema=False)
+    return render
+
+
+def create_app(settings: Optional[config.Settings] = None) -> FastAPI:
+    """Build the application.
+
+    Routers, models and the caches they pull in are imported here rather than
+    at module import, so ``import app.main`` stays cheap and needs no
+    environment. Passing settings makes every later get_settings() return them.
+    """
+    if settings is not None:
+        config.configure(settings)
+    settings = config.get_settings()
+
+    from . import models
+    from .models import init_db, close_db
+    from .core.catalog import province_catalog
+    from .core.hashing import hasher
+    from .core.metrics import MetricsMiddleware, registry
+    from .core.principals import principal_cache
+    from .core.revocation import revoked_tokens
+    from .core.rate_limit import login_throttle
+    from .core.last_login import last_login_buffer
+    from .core.coherence import PRINCIPALS, PROVINCES, REVOCATIONS, cache_coherence
+    from .routers import router
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await init_db(settings)
+        async with models.session_factory() as session:
+            await province_catalog.load(session)
+            await revoked_tokens.load(session)
+        last_login_buffer.start(models.session_factory)
+        await cache_coherence.start(models.session_factory)
+        render_openapi()
+        yield
+        await cache_coherence.stop()
+        await last_login_buffer.stop()
+        province_catalog.invalidate()
+        revoked_tokens.clear()
+        await close_db()
+        hasher.shutdown()
+
+    app = FastAPI(
+        title="Travel API",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+    registry.add_gauges("password_hasher", hasher.stats)
+    registry.add_gauges("province_catalog", province_catalog.stats)
+    registry.add_gauges("principal_cache", principal_cache.stats)
+    registry.add_gauges("revoked_tokens", revoked_tokens.stats)
+    registry.add_gauges("login_throttle", login_throttle.stats)
+    registry.add_gauges("last_login_buffer", last_login_buffer.stats)
+    registry.add_gauges("cache_coherence", cache_coherence.stats)
+
+    cache_coherence.register(PROVINCES, lambda session: province_catalog.invalidate())
+    cache_coherence.register(PRINCIPALS, lambda session: principal_cache.clear())
+    cache_coherence.register(REVOCATIONS, revoked_tokens.load)
+
+    # app.routers.router already aggregates every router; including it once
+    # keeps each operation unique in the rendered OpenAPI document.
+    app.include_router(router)
+
+    @app.get("/")
+    def read_root() -> dict:
+        return {"message": "Hello World"}
+
+    render_openapi = _cached_openapi(app)
+    return app
+
+
+_app: Optional[FastAPI] = None
+
+
+def __getattr__(name: str):
+    # ``app.main:app`` keeps working for uvicorn and the tests; the default
+    # application is only built the first time someone asks for it.
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,54 +1,96 @@
 import asyncio
-from typing import AsyncIterator
+from typing import AsyncIterator, Optional
 
+from fastapi import Request
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, async_sessionmaker
 
+from app.core import config
+from app.core.metrics import InstrumentedAsyncQueuePool, instrument_engine
+from app.core.query_budget import track_request_queries
 from .user_model import *
 from .province import *
-
-connect_args = {"check_same_thread": False}
+from .identifiers import *
+from .tax import *
+from .token_model import *
+from .cache_version import *
+from .repository import UserRepository, ProvinceRepository
+from .schema import bootstrap_schema
 
 engine: AsyncEngine = None
+session_factory: async_sessionmaker[AsyncSession] = None
+
+
+def _engine_options(settings: config.Settings) -> dict:
+    """Build create_async_engine keyword arguments from settings."""
+    options = {
+        "echo": settings.SQLDB_ECHO,
+        "pool_pre_ping": settings.SQLDB_POOL_PRE_PING,
+    }
+    url = make_url(settings.SQLDB_URL)
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": settings.SQLDB_CONNECT_TIMEOUT,
+        }
+        # In-memory SQLite uses a StaticPool, which takes no sizing arguments.
+        if url.database in (None, "", ":memory:"):
+            return options
+
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.SQLDB_POOL_SIZE,
+        max_overflow=settings.SQLDB_MAX_OVERFLOW,
+        pool_timeout=settings.SQLDB_POOL_TIMEOUT,
+        pool_recycle=settings.SQLDB_POOL_RECYCLE,
+    )
+    return options
 
 
-async def init_db():
-    """Initialize the database engine and create tables."""
-    global engine
+async def init_db(settings: Optional[config.Settings] = None):
+    """Initialize the database engine and session factory, then create tables."""
+    global engine, session_factory
 
-    engine = create_async_engine(
-        "sqlite+aiosqlite:///database.db",
-        echo=True,
-        future=True,
-        connect_args=connect_args,
+    settings = settings or config.get_settings()
+    engine = create_async_engine(settings.SQLDB_URL, **_engine_options(settings))
+    instrument_engine(engine)
+    session_factory = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
     )
 
     await create_db_and_tables()
 
 
 async def create_db_and_tables():
-    """Create database tables."""
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.drop_all)
-        await conn.run_sync(SQLModel.metadata.create_all)
+    """Create or migrate database tables, skipping DDL when the schema is current."""
+    if await bootstrap_schema(engine):
+        async with engine.begin() as conn:
+            await conn.run_sync(backfill_identifiers)
+
 
+def _route_label(request: Optional[Request]) -> str:
+    if request is None:
+        return "session"
+    route = request.scope.get("route")
+    return f"{request.method} {getattr(route, 'path', request.url.path)}"
 
-async def get_session() -> AsyncIterator[AsyncSession]:
-    """Get async database session."""
-    if engine is None:
+
+async def get_session(request: Request = None) -> AsyncIterator[AsyncSession]:
+    """Get async database session, counting its statements against the route's budget."""
+    if session_factory is None:
         raise Exception("Database engine is not initialized. Call init_db() first.")
 
-    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-    async with async_session() as session:
-        yield session
+    with track_request_queries(_route_label(request)):
+        async with session_factory() as session:
+            yield session
 
 
 async def close_db():
     """Close database connection."""
-    global engine
+    global engine, session_factory
     if engine is not None:
         await engine.dispose()
         engine = None
-
+        session_factory = None
@@ -0,0 +1,10 @@
+from sqlmodel import SQLModel, Field as ORMField
+
+
+class DBCacheVersion(SQLModel, table=True):
+    """A counter per cached dataset, bumped in the same transaction as writes to it."""
+
+    __tablename__ = "cache_versions"
+
+    name: str = ORMField(primary_key=True)
+    version: int = ORMField(default=0)
@@ -0,0 +1,168 @@
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import Index, delete, event, inspect, insert, select as sa_select, text
+from sqlmodel import SQLModel, Field as ORMField, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .user_model import DBUser
+
+IDENTIFIER_FIELDS = ("email", "phone_number", "username")
+_PHONE_SEPARATORS = re.compile(r"[\s\-().]")
+
+
+class DBUserIdentifier(SQLModel, table=True):
+    """Normalized login identifiers (email, phone, username) pointing at a user."""
+
+    __tablename__ = "user_identifiers"
+    # Email and phone must resolve to exactly one user. Usernames were never
+    # unique, so they are only checked at registration and update time.
+    __table_args__ = (
+        Index(
+            "ix_user_identifiers_unique_contact",
+            "identifier",
+            "kind",
+            unique=True,
+            sqlite_where=text("kind IN ('email', 'phone')"),
+            postgresql_where=text("kind IN ('email', 'phone')"),
+        ),
+    )
+
+    id: Optional[int] = ORMField(default=None, primary_key=True)
+    identifier: str = ORMField(index=True)
+    # "email" < "phone" < "username", so ordering by kind prefers unique identifiers.
+    kind: str
+    user_id: int = ORMField(foreign_key="users.id", index=True)
+
+
+def normalize_identifier(value: str) -> str:
+    return value.strip().lower()
+
+
+def normalize_phone(value: str) -> str:
+    return _PHONE_SEPARATORS.sub("", value.strip())
+
+
+def canonical_identifier(value: str) -> str:
+    """One key per account-identifying input: phone digits, or the lower-cased text."""
+    phone = normalize_phone(value)
+    if phone.lstrip("+").isdigit():
+        return phone
+    return normalize_identifier(value)
+
+
+def identifier_keys(value: str) -> List[str]:
+    """Every normalized form a login identifier could be stored under."""
+    return sorted({normalize_identifier(value), normalize_phone(value)})
+
+
+def _identifier_rows(user: DBUser) -> List[dict]:
+    rows = []
+    if user.email:
+        rows.append({"identifier": normalize_identifier(user.email), "kind": "email"})
+    if user.phone_number:
+        rows.append({"identifier": normalize_phone(user.phone_number), "kind": "phone"})
+    if user.username:
+        rows.append({"identifier": normalize_identifier(user.username), "kind": "username"})
+    for row in rows:
+        row["user_id"] = user.id
+    return rows
+
+
+_identifiers = DBUserIdentifier.__table__
+
+
+@event.listens_for(DBUser, "after_insert")
+def _insert_identifiers(mapper, connection, target: DBUser) -> None:
+    rows = _identifier_rows(target)
+    if rows:
+        connection.execute(insert(_identifiers), rows)
+
+
+@event.listens_for(DBUser, "after_update")
+def _update_identifiers(mapper, connection, target: DBUser) -> None:
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in IDENTIFIER_FIELDS):
+        return
+    connection.execute(delete(_identifiers).where(_identifiers.c.user_id == target.id))
+    rows = _identifier_rows(target)
+    if rows:
+        connection.execute(insert(_identifiers), rows)
+
+
+@event.listens_for(DBUser, "before_delete")
+def _delete_identifiers(mapper, connection, target: DBUser) -> None:
+    connection.execute(delete(_identifiers).where(_identifiers.c.user_id == target.id))
+
+
+async def reindex_identifiers(session: AsyncSession, user: DBUser) -> None:
+    """Rebuild a user's identifier rows after a write that bypassed the ORM events."""
+    await session.exec(delete(_identifiers).where(_identifiers.c.user_id == user.id))
+    rows = _identifier_rows(user)
+    if rows:
+        await session.exec(insert(_identifiers), params=rows)
+
+
+class IdentifierConflict(ValueError):
+    """Raised when a write would give a user another user's login identifier."""
+
+    def __init__(self, fields: List[str]):
+        super().__init__(f"Identifiers already in use: {', '.join(fields)}")
+        self.fields = fields
+
+
+async def find_identifier_conflicts(
+    session: AsyncSession, values: Dict[str, Optional[str]], exclude_user_id: Optional[int] = None
+) -> List[str]:
+    """Fields in values whose normalized forms already log another user in."""
+    keys_by_field = {
+        field: identifier_keys(value)
+        for field, value in values.items()
+        if field in IDENTIFIER_FIELDS and value
+    }
+    if not keys_by_field:
+        return []
+    q = sa_select(_identifiers.c.identifier).where(
+        _identifiers.c.identifier.in_({key for keys in keys_by_field.values() for key in keys})
+    )
+    if exclude_user_id is not None:
+        q = q.where(_identifiers.c.user_id != exclude_user_id)
+    taken = set((await session.exec(q)).scalars())
+    return [field for field, keys in keys_by_field.items() if taken.intersection(keys)]
+
+
+async def get_users_by_identifier(session: AsyncSession, identifier: str) -> List[DBUser]:
+    """Every user a username, email or phone number could mean, in one indexed query.
+
+    Email and phone are unique, but usernames and rows written before the
+    unique index existed can still share a normalized identifier.
+    """
+    q = (
+        select(DBUser)
+        .join(DBUserIdentifier, DBUserIdentifier.user_id == DBUser.id)
+        .where(DBUserIdentifier.identifier.in_(identifier_keys(identifier)))
+        .order_by(DBUserIdentifier.kind, DBUser.id)
+    )
+    result = await session.exec(q)
+    return list({user.id: user for user in result.unique().all()}.values())
+
+
+async def authenticate_user(session: AsyncSession, identifier: str, password: str) -> Optional[DBUser]:
+    """Return the user identifier and password log in as, trying every candidate."""
+    for user in await get_users_by_identifier(session, identifier):
+        if await user.verify_password_async(password):
+            return user
+    return None
+
+
+def backfill_identifiers(sync_conn) -> None:
+    """Index users created before the identifier table existed."""
+    users = DBUser.__table__
+    indexed = sa_select(_identifiers.c.user_id)
+    missing = sync_conn.execute(
+        sa_select(users.c.id, users.c.email, users.c.phone_number, users.c.username)
+        .where(users.c.id.not_in(indexed))
+    ).all()
+    rows = [row for user in missing for row in _identifier_rows(user)]
+    if rows:
+        sync_conn.execute(insert(_identifiers), rows)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from sqlmodel import SQLModel, Field as ORMField
 
 class ProvinceBase(BaseModel):
@@ -14,6 +14,10 @@ class ProvinceRead(ProvinceBase):
     tax_reduction: float 
     model_config = ConfigDict(from_attributes=True)
 
+class ProvinceSummary(ProvinceBase):
+    id: int
+    model_config = ConfigDict(from_attributes=True)
+
 class ProvinceUpdate(BaseModel):
     province_name: Optional[str] = None
     is_secondary: Optional[bool] = None
@@ -24,4 +28,15 @@ class DBProvince(SQLModel, table=True):
 
     id: int | None = ORMField(default=None, primary_key=True)
     province_name: str = ORMField(unique=True, index=True)
-    is_secondary: bool = ORMField(default=False)
\ No newline at end of file
+    is_secondary: bool = ORMField(default=False)
+
+class ProvinceImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class ProvinceImportResult(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: List[ProvinceImportError] = []
@@ -0,0 +1,98 @@
+import datetime
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .identifiers import (
+    IDENTIFIER_FIELDS, IdentifierConflict, find_identifier_conflicts, reindex_identifiers
+)
+from .province import DBProvince
+from .user_model import DBUser
+
+
+class UserRepository:
+    """Single-statement writes for users.
+
+    Every mutation is one ``UPDATE … WHERE id = :id AND id = :owner_id
+    RETURNING …``, so a miss means the user is gone or not the caller's; use
+    ``exists`` to tell the two apart on the error path only.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def exists(self, user_id: int) -> bool:
+        result = await self.session.exec(select(DBUser.id).where(DBUser.id == user_id))
+        return result.first() is not None
+
+    async def _update(self, user_id: int, owner_id: int, values: dict, *returning):
+        statement = (
+            update(DBUser)
+            .where(DBUser.id == user_id, DBUser.id == owner_id)
+            .values(**values)
+            .returning(*returning)
+        )
+        return (await self.session.exec(statement)).scalar_one_or_none()
+
+    async def update_profile(self, user_id: int, owner_id: int, changes: dict) -> Optional[DBUser]:
+        """Raises IdentifierConflict if changes would collide with another user's login."""
+        if user_id == owner_id and IDENTIFIER_FIELDS & changes.keys():
+            conflicts = await find_identifier_conflicts(self.session, changes, exclude_user_id=user_id)
+            if conflicts:
+                raise IdentifierConflict(conflicts)
+        values = {**changes, "updated_date": datetime.datetime.now(datetime.timezone.utc)}
+        user = await self._update(user_id, owner_id, values, DBUser)
+        # Bulk UPDATE skips the mapper events that normally keep identifiers in sync.
+        if user is not None and IDENTIFIER_FIELDS & changes.keys():
+            await reindex_identifiers(self.session, user)
+        return user
+
+    async def select_province(self, user_id: int, owner_id: int, province_id: int) -> bool:
+        updated = await self._update(
+            user_id, owner_id, {"selected_province_id": province_id}, DBUser.id
+        )
+        return updated is not None
+
+    async def get_password_hash(self, user_id: int) -> Optional[str]:
+        result = await self.session.exec(
+            select(DBUser.hashed_password).where(DBUser.id == user_id)
+        )
+        return result.scalars().first()
+
+    async def replace_password_hash(
+        self, user_id: int, owner_id: int, current_hash: str, new_hash: str
+    ) -> bool:
+        """Swap the hash only if it is still the one the caller verified against."""
+        statement = (
+            update(DBUser)
+            .where(
+                DBUser.id == user_id,
+                DBUser.id == owner_id,
+                DBUser.hashed_password == current_hash,
+            )
+            .values(
+                hashed_password=new_hash,
+                updated_date=datetime.datetime.now(datetime.timezone.utc),
+            )
+            .returning(DBUser.id)
+        )
+        return (await self.session.exec(statement)).scalar_one_or_none() is not None
+
+
+class ProvinceRepository:
+    """Single-statement writes for provinces."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def update(self, province_id: int, changes: dict) -> Optional[DBProvince]:
+        if not changes:
+            return await self.session.get(DBProvince, province_id)
+        statement = (
+            update(DBProvince)
+            .where(DBProvince.id == province_id)
+            .values(**changes)
+            .returning(DBProvince)
+        )
+        return (await self.session.exec(statement)).scalar_one_or_none()
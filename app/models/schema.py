@@ -0,0 +1,168 @@
+import datetime
+import hashlib
+import logging
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+)
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.schema import CreateColumn
+from sqlmodel import SQLModel
+
+logger = logging.getLogger(__name__)
+
+# Kept outside SQLModel.metadata so the bookkeeping table does not feed its own hash.
+schema_metadata = MetaData()
+
+schema_version_table = Table(
+    "schema_version",
+    schema_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
+    Column("fingerprint", String(64), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Arbitrary application-wide key for PostgreSQL's advisory lock.
+_SCHEMA_LOCK_KEY = 0x7472_6176
+
+
+class SchemaMigrationError(RuntimeError):
+    """Raised when the model changes cannot be applied additively."""
+
+
+def metadata_fingerprint(metadata: MetaData = SQLModel.metadata) -> str:
+    """Return a stable SHA-256 of the tables, columns and indexes in metadata."""
+    digest = hashlib.sha256()
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        digest.update(f"table:{table.name}\n".encode())
+        for column in table.columns:
+            foreign_keys = sorted(fk.target_fullname for fk in column.foreign_keys)
+            server_default = (
+                str(column.server_default.arg) if column.server_default is not None else None
+            )
+            digest.update(
+                f"column:{column.name}:{column.type!r}:{column.nullable}:"
+                f"{column.primary_key}:{column.unique}:{foreign_keys}:"
+                f"{server_default}\n".encode()
+            )
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            columns = [c.name for c in index.columns]
+            digest.update(f"index:{index.name}:{columns}:{index.unique}\n".encode())
+    return digest.hexdigest()
+
+
+def _apply_additive_migrations(sync_conn, metadata: MetaData) -> None:
+    """Create missing tables, columns and indexes without touching existing data."""
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+    dialect = sync_conn.dialect
+    preparer = dialect.identifier_preparer
+
+    metadata.create_all(sync_conn, checkfirst=True)
+
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if column.primary_key or (not column.nullable and column.server_default is None):
+                raise SchemaMigrationError(
+                    f"Cannot add column {table.name}.{column.name} in place: "
+                    "new columns must be nullable or carry a server default"
+                )
+            column_ddl = CreateColumn(column).compile(dialect=dialect)
+            sync_conn.execute(
+                text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column_ddl}")
+            )
+            logger.info("Added column %s.%s", table.name, column.name)
+
+        dropped = existing_columns - {c.name for c in table.columns}
+        if dropped:
+            logger.warning(
+                "Columns %s on %s are no longer mapped and were left in place",
+                sorted(dropped), table.name,
+            )
+
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(sync_conn)
+                logger.info("Created index %s", index.name)
+
+
+async def _stored_fingerprint(engine: AsyncEngine) -> str | None:
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                select(schema_version_table.c.fingerprint).where(schema_version_table.c.id == 1)
+            )
+            return result.scalar_one_or_none()
+    except DBAPIError:
+        # The bookkeeping table does not exist yet: this is a fresh database.
+        return None
+
+
+async def _lock_schema(conn: AsyncConnection) -> None:
+    """Open conn's transaction holding a lock that serializes concurrent bootstraps."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        # Take the write lock up front; DDL would otherwise run outside any transaction.
+        await conn.exec_driver_sql("BEGIN IMMEDIATE")
+    elif dialect == "postgresql":
+        await conn.execute(select(func.pg_advisory_xact_lock(_SCHEMA_LOCK_KEY)))
+
+
+def _locked_fingerprint(sync_conn) -> str | None:
+    if not inspect(sync_conn).has_table(schema_version_table.name):
+        return None
+    return sync_conn.execute(
+        select(schema_version_table.c.fingerprint).where(schema_version_table.c.id == 1)
+    ).scalar_one_or_none()
+
+
+async def bootstrap_schema(engine: AsyncEngine, metadata: MetaData = SQLModel.metadata) -> bool:
+    """Bring the database up to date with metadata.
+
+    When the stored fingerprint matches, this costs a single SELECT and runs no
+    DDL. Otherwise missing tables, columns and indexes are added and the schema
+    version is bumped. Returns True when DDL was applied.
+    """
+    fingerprint = metadata_fingerprint(metadata)
+    if await _stored_fingerprint(engine) == fingerprint:
+        return False
+
+    async with engine.connect() as conn:
+        await _lock_schema(conn)
+        # Another worker may have applied the same schema while this one waited.
+        if await conn.run_sync(_locked_fingerprint) == fingerprint:
+            await conn.rollback()
+            return False
+
+        await conn.run_sync(schema_metadata.create_all, checkfirst=True)
+        await conn.run_sync(_apply_additive_migrations, metadata)
+
+        values = {
+            "fingerprint": fingerprint,
+            "applied_at": datetime.datetime.now(datetime.timezone.utc),
+        }
+        bump = (
+            schema_version_table.update()
+            .where(schema_version_table.c.id == 1)
+            .values(version=schema_version_table.c.version + 1, **values)
+        )
+        if (await conn.execute(bump)).rowcount == 0:
+            try:
+                async with conn.begin_nested():
+                    await conn.execute(schema_version_table.insert().values(id=1, version=1, **values))
+            except IntegrityError:
+                # Another worker bootstrapped the same database first.
+                await conn.execute(bump)
+        await conn.commit()
+
+    logger.info("Database schema bootstrapped (fingerprint %s)", fingerprint[:12])
+    return True
@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class TaxQuoteItem(BaseModel):
+    province_id: int
+    amount: float = Field(ge=0, json_schema_extra=dict(example=15000.0))
+
+
+class TaxQuoteRequest(BaseModel):
+    items: List[TaxQuoteItem] = Field(min_length=1, max_length=10_000)
+
+
+class TaxQuote(BaseModel):
+    province_id: int
+    amount: float
+    tax_reduction: Optional[float] = None
+    reduction_amount: Optional[float] = None
+
+
+class TaxQuoteResponse(BaseModel):
+    quotes: List[TaxQuote]
@@ -0,0 +1,37 @@
+import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+from sqlmodel import SQLModel, Field as ORMField
+
+
+class TokenRefresh(BaseModel):
+    refresh_token: str = Field(json_schema_extra=dict(example="eyJhbGciOiJIUzI1NiIs..."))
+
+
+class DBRefreshToken(SQLModel, table=True):
+    """One issued refresh token. Rotation marks it used and issues a sibling in the same family."""
+
+    __tablename__ = "refresh_tokens"
+
+    jti: str = ORMField(primary_key=True)
+    user_id: int = ORMField(foreign_key="users.id", index=True, ondelete="CASCADE")
+    family_id: str = ORMField(index=True)
+    issued_at: datetime.datetime
+    expires_at: datetime.datetime
+    rotated_at: Optional[datetime.datetime] = ORMField(default=None)
+    revoked_at: Optional[datetime.datetime] = ORMField(default=None)
+
+
+class TokenRevoke(BaseModel):
+    token: str = Field(json_schema_extra=dict(example="eyJhbGciOiJIUzI1NiIs..."))
+
+
+class DBRevokedToken(SQLModel, table=True):
+    """A revoked token id, kept until the token would have expired anyway."""
+
+    __tablename__ = "revoked_tokens"
+
+    jti: str = ORMField(primary_key=True)
+    expires_at: datetime.datetime = ORMField(index=True)
+    revoked_at: datetime.datetime
@@ -7,11 +7,15 @@ from pydantic import (
     ConfigDict,
     EmailStr,
     StringConstraints, 
-    Field
+    Field,
+    model_validator
 )
-from sqlmodel import SQLModel, Field as ORMField
+from sqlmodel import SQLModel, Field as ORMField, Relationship
 from sqlalchemy import Column, String, JSON
 
+from app.core.hashing import hasher
+from .province import DBProvince, ProvinceSummary
+
 
 class BaseUser(BaseModel):
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
@@ -44,6 +48,18 @@ class User(BaseUser):
         default=None,
         json_schema_extra=dict(example="2023-01-01T00:00:00.000000")
     )
+    selected_province: Optional[ProvinceSummary] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _skip_unloaded_province(cls, data):
+        # Reading an unloaded relationship would lazy-load, which fails under
+        # asyncio; users returned by UPDATE ... RETURNING arrive that way, and
+        # their routes fill selected_province in from the province catalog.
+        state = getattr(data, "_sa_instance_state", None)
+        if state is not None and "selected_province" in state.unloaded:
+            return {name: getattr(data, name) for name in cls.model_fields if name != "selected_province"}
+        return data
 
 
 class ReferenceUser(BaseModel):
@@ -118,6 +134,10 @@ class DBUser(SQLModel, table=True):
     email: Optional[EmailStr] = ORMField(default=None, unique=True, index=True)
     phone_number: str = ORMField(unique=True, index=True)
     selected_province_id: Optional[int] = ORMField(foreign_key="provinces.id")
+    # Joined eagerly so a user and their province always arrive in one statement.
+    selected_province: Optional[DBProvince] = Relationship(
+        sa_relationship_kwargs={"lazy": "joined"}
+    )
 
     username: str = ORMField(index=True)
     first_name: str
@@ -136,6 +156,7 @@ class DBUser(SQLModel, table=True):
         default_factory=datetime.datetime.utcnow
     )
     last_login_date: Optional[datetime.datetime] = ORMField(default=None)
+    is_active: bool = ORMField(default=True, sa_column_kwargs={"server_default": "1"})
 
     def verify_password(self, plain_password: str) -> bool:
         return bcrypt.checkpw(
@@ -149,5 +170,11 @@ class DBUser(SQLModel, table=True):
             bcrypt.gensalt()
         ).decode("utf-8")
 
+    async def verify_password_async(self, plain_password: str) -> bool:
+        return await hasher.verify(plain_password, self.hashed_password)
+
+    async def set_password_async(self, plain_password: str) -> None:
+        self.hashed_password = await hasher.hash(plain_password)
+
     def has_roles(self, roles: List[str]) -> bool:
         return any(role in self.roles for role in roles)
\ No newline at end of file
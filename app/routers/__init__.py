@@ -2,8 +2,14 @@ from fastapi import APIRouter
 from .user_router import router as user_router
 from .province_router import router as province_router
 from .authentication_router import router as authentication_router
+from .tax_router import router as tax_router
+from .metrics_router import router as metrics_router
+from .export_router import router as export_router
 
 router = APIRouter()
 router.include_router(user_router)
 router.include_router(province_router)
 router.include_router(authentication_router)
+router.include_router(tax_router)
+router.include_router(metrics_router)
+router.include_router(export_router)
@@ -1,46 +1,185 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import select
-from typing import Annotated
+from sqlmodel import select, update
+from typing import Annotated, Optional
 import datetime
+import uuid
+import jwt
 
 from app import models
 from app.core import config, security
+from app.core.coherence import REVOCATIONS, bump_cache_version, cache_coherence
+from app.core.deps import RoleChecker, get_token_payload
+from app.core.last_login import last_login_buffer
+from app.core.rate_limit import enforce_login_throttle
+from app.core.revocation import apply_revocation, revoke_token
 
 router = APIRouter(tags=["authentication"])
-settings = config.get_settings()
+settings = config.settings
+
+
+def _issue_tokens(
+    session: models.AsyncSession,
+    user_id: int,
+    issued_at: datetime.datetime,
+    family_id: Optional[str] = None,
+) -> models.Token:
+    """Mint an access/refresh pair and stage the refresh token's row on the session."""
+    access_token_expires = datetime.timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    refresh_token_expires = datetime.timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+    jti = uuid.uuid4().hex
+
+    access_token = security.create_access_token(data={"sub": str(user_id)}, expires_delta=access_token_expires)
+    refresh_token = security.create_refresh_token(
+        data={"sub": str(user_id), "jti": jti}, expires_delta=refresh_token_expires
+    )
+    session.add(models.DBRefreshToken(
+        jti=jti,
+        user_id=user_id,
+        family_id=family_id or jti,
+        issued_at=issued_at,
+        expires_at=issued_at + refresh_token_expires,
+    ))
+
+    return models.Token(
+        access_token=access_token,
+        refresh_token=refresh_token,
+        token_type="Bearer",
+        scope="",
+        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES,
+        expires_at=datetime.datetime.now(datetime.timezone.utc) + access_token_expires,
+        issued_at=issued_at,
+        user_id=user_id,
+    )
+
 
 @router.post("/token", response_model=models.Token)
 async def login_for_access_token(
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     session: Annotated[models.AsyncSession, Depends(models.get_session)]
 ):
-    result = await session.exec(select(models.DBUser).where(models.DBUser.username == form_data.username))
-    user = result.one_or_none()
-
+    enforce_login_throttle(request, form_data.username)
+    user = await models.authenticate_user(session, form_data.username, form_data.password)
     if not user:
-        result = await session.exec(select(models.DBUser).where(models.DBUser.email == form_data.username))
-        user = result.one_or_none()
-
-    if not user or not user.verify_password(form_data.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
 
-    user.last_login_date = datetime.datetime.now(datetime.timezone.utc)
-    session.add(user)
+    # last_login_date is written behind; only the refresh token row is committed here.
+    logged_in_at = datetime.datetime.now(datetime.timezone.utc)
+    last_login_buffer.record(user.id, logged_in_at)
+    token = _issue_tokens(session, user.id, logged_in_at)
     await session.commit()
-    await session.refresh(user)
 
-    access_token_expires = datetime.timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(data={"sub": str(user.id)}, expires_delta=access_token_expires)
-    refresh_token = security.create_refresh_token(data={"sub": str(user.id)})
+    return token
 
-    return models.Token(
-        access_token=access_token,
-        refresh_token=refresh_token,
-        token_type="Bearer",
-        scope="",
-        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES,
-        expires_at=datetime.datetime.now(datetime.timezone.utc) + access_token_expires,
-        issued_at=user.last_login_date,
-        user_id=user.id,
+
+@router.post("/token/refresh", response_model=models.Token)
+async def refresh_access_token(
+    token_in: models.TokenRefresh,
+    session: Annotated[models.AsyncSession, Depends(models.get_session)]
+):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
+    try:
+        payload = jwt.decode(token_in.refresh_token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+        user_id = int(payload["sub"])
+        jti = payload["jti"]
+    except Exception:
+        raise credentials_exception
+    if payload.get("scope") != "refresh":
+        raise credentials_exception
+
+    # Claim the token in one statement so concurrent refreshes cannot both win,
+    # and only while its user still exists.
+    now = datetime.datetime.now(datetime.timezone.utc)
+    result = await session.exec(
+        update(models.DBRefreshToken)
+        .where(
+            models.DBRefreshToken.jti == jti,
+            models.DBRefreshToken.user_id == user_id,
+            models.DBRefreshToken.rotated_at.is_(None),
+            models.DBRefreshToken.revoked_at.is_(None),
+            select(models.DBUser.id).where(models.DBUser.id == user_id).exists(),
+        )
+        .values(rotated_at=now)
+        .returning(models.DBRefreshToken.family_id)
+    )
+    family_id = result.scalar_one_or_none()
+
+    if family_id is None:
+        stored = await session.get(models.DBRefreshToken, jti)
+        if stored is not None and stored.rotated_at is not None and stored.revoked_at is None:
+            # A rotated token came back: assume it leaked and revoke its whole family.
+            await session.exec(
+                update(models.DBRefreshToken)
+                .where(
+                    models.DBRefreshToken.family_id == stored.family_id,
+                    models.DBRefreshToken.revoked_at.is_(None),
+                )
+                .values(revoked_at=now)
+            )
+            await session.commit()
+        raise credentials_exception
+
+    token = _issue_tokens(session, user_id, now, family_id=family_id)
+    await session.commit()
+    return token
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    payload: Annotated[dict, Depends(get_token_payload)],
+    session: Annotated[models.AsyncSession, Depends(models.get_session)],
+    token_in: Optional[models.TokenRefresh] = None,
+):
+    """Revoke the caller's access token and, if given, their refresh token family."""
+    revoked = [payload]
+    if token_in is not None:
+        try:
+            refresh_payload = jwt.decode(
+                token_in.refresh_token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+            )
+        except jwt.PyJWTError:
+            refresh_payload = None
+        if refresh_payload and refresh_payload.get("sub") == payload["sub"]:
+            revoked.append(refresh_payload)
+
+    for token_payload in revoked:
+        await revoke_token(session, token_payload)
+    version = await bump_cache_version(session, REVOCATIONS)
+    await session.commit()
+    for token_payload in revoked:
+        apply_revocation(token_payload)
+    cache_coherence.observe(REVOCATIONS, version)
+
+
+@router.post(
+    "/token/revoke",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(RoleChecker("admin"))],
+)
+async def revoke(
+    token_in: models.TokenRevoke,
+    session: Annotated[models.AsyncSession, Depends(models.get_session)],
+):
+    """Admin: revoke any access or refresh token before it expires."""
+    try:
+        payload = jwt.decode(
+            token_in.token,
+            settings.SECRET_KEY,
+            algorithms=[security.ALGORITHM],
+            options={"verify_exp": False},
+        )
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=400, detail="Malformed token")
+    if payload.get("exp", 0) <= datetime.datetime.now(datetime.timezone.utc).timestamp():
+        return
+
+    await revoke_token(session, payload)
+    version = await bump_cache_version(session, REVOCATIONS)
+    await session.commit()
+    apply_revocation(payload)
+    cache_coherence.observe(REVOCATIONS, version)
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Literal, Optional
+
+from app.models import get_session
+from app.models.province import DBProvince
+from app.models.user_model import DBUser
+from app.core.deps import RoleChecker
+from app.core.exports import EXPORT_FORMATS, stream_table
+from app.core import config
+
+router = APIRouter(
+    prefix="/exports",
+    tags=["exports"],
+    dependencies=[Depends(RoleChecker("admin"))],
+)
+settings = config.settings
+
+# hashed_password never leaves the database.
+_USER_COLUMNS = tuple(
+    column for column in DBUser.__table__.columns if column.key != "hashed_password"
+)
+_PROVINCE_COLUMNS = tuple(DBProvince.__table__.columns)
+
+
+def _export(session: AsyncSession, columns, name: str, fmt: str, after_id: Optional[int]):
+    return StreamingResponse(
+        stream_table(session.bind, columns, fmt, after_id, settings.EXPORT_BATCH_SIZE),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+@router.get("/users")
+async def export_users(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    after_id: Optional[int] = Query(None, description="Resume after this user id"),
+    session: AsyncSession = Depends(get_session)
+):
+    return _export(session, _USER_COLUMNS, "users", format, after_id)
+
+
+@router.get("/provinces")
+async def export_provinces(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    after_id: Optional[int] = Query(None, description="Resume after this province id"),
+    session: AsyncSession = Depends(get_session)
+):
+    return _export(session, _PROVINCE_COLUMNS, "provinces", format, after_id)
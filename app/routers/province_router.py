@@ -1,28 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
-from sqlmodel import select
+from bisect import bisect_right
+from itertools import islice
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel.ext.asyncio.session import AsyncSession
-from typing import List
+from typing import List, Optional
 
 from ..models import get_session
-from app.models.province import ProvinceCreate, ProvinceRead, DBProvince, ProvinceUpdate
+from app.models.repository import ProvinceRepository
+from app.models.province import (
+    ProvinceCreate, ProvinceRead, DBProvince, ProvinceUpdate, ProvinceImportResult
+)
 from app.core.deps import RoleChecker
+from app.core.catalog import ProvinceEntry, province_catalog
+from app.core.coherence import PROVINCES, bump_cache_version, cache_coherence
+from app.core.etag import province_catalog_etag
+from app.core import config
+from app.core.province_import import CSV_TYPES, JSONL_TYPES, import_provinces
+from app.core.tax import province_rate
+from app.core.responses import fast_json
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/provinces", tags=["provinces"])
+settings = config.settings
 
 # Role checker instance for admin role
 admin_required = RoleChecker("admin")
 
 
-def _province_with_tax(province: DBProvince) -> ProvinceRead:
-    tax_reduction = 0.2 if province.is_secondary else 0.1
+def _province_with_tax(province: DBProvince | ProvinceEntry) -> ProvinceRead:
     return ProvinceRead(
         id=province.id,
         province_name=province.province_name,
         is_secondary=province.is_secondary,
-        tax_reduction=tax_reduction
+        tax_reduction=province_rate(province)
     )
 
 
+def _province_payload(province: DBProvince | ProvinceEntry) -> dict:
+    # Same keys, order and values as _province_with_tax(...).model_dump().
+    return {
+        "province_name": province.province_name,
+        "is_secondary": province.is_secondary,
+        "id": province.id,
+        "tax_reduction": province_rate(province),
+    }
+
+
 @router.post("/", response_model=ProvinceRead, dependencies=[Depends(admin_required)])
 async def create_province(
     province: ProvinceCreate,
@@ -30,26 +53,103 @@ async def create_province(
 ):
     db_province = DBProvince.from_orm(province)
     session.add(db_province)
+    version = await bump_cache_version(session, PROVINCES)
     await session.commit()
     await session.refresh(db_province)
+    province_catalog.put(db_province, version)
+    cache_coherence.observe(PROVINCES, version)
     return _province_with_tax(db_province)
 
 
-@router.get("/{province_id}", response_model=ProvinceRead)
+@router.post(
+    "/import",
+    response_model=ProvinceImportResult,
+    dependencies=[Depends(admin_required)],
+)
+async def bulk_import_provinces(
+    request: Request,
+    session: AsyncSession = Depends(get_session)
+):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in CSV_TYPES | JSONL_TYPES:
+        raise HTTPException(
+            status_code=415, detail="Upload provinces as text/csv or application/x-ndjson"
+        )
+
+    result = ProvinceImportResult()
+    try:
+        await import_provinces(
+            session,
+            request.stream(),
+            content_type,
+            batch_size=settings.PROVINCE_IMPORT_BATCH_SIZE,
+            max_errors=settings.PROVINCE_IMPORT_MAX_ERRORS,
+            result=result,
+        )
+    finally:
+        # Batches commit as they go, so even a failed import may have changed
+        # provinces; the bump gets its own transaction.
+        if result.inserted or result.updated:
+            await session.rollback()
+            province_catalog.invalidate()
+            version = await bump_cache_version(session, PROVINCES)
+            await session.commit()
+            cache_coherence.observe(PROVINCES, version)
+    return result
+
+
+@router.get(
+    "/{province_id}",
+    response_model=ProvinceRead,
+    dependencies=[Depends(province_catalog_etag)],
+)
 async def get_province(
     province_id: int,
+    response: Response,
     session: AsyncSession = Depends(get_session)
 ):
-    province = await session.get(DBProvince, province_id)
+    await province_catalog.ensure_loaded(session)
+    province = province_catalog.get(province_id)
     if not province:
         raise HTTPException(status_code=404, detail="Province not found")
+    if settings.FAST_JSON_RESPONSES:
+        return fast_json(_province_payload(province), response)
     return _province_with_tax(province)
 
 
-@router.get("/", response_model=List[ProvinceRead])
-async def list_provinces(session: AsyncSession = Depends(get_session)):
-    result = await session.exec(select(DBProvince))
-    provinces = result.all()
+@router.get(
+    "/",
+    response_model=List[ProvinceRead],
+    dependencies=[Depends(province_catalog_etag)],
+)
+async def list_provinces(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    is_secondary: Optional[bool] = None,
+    province_name: Optional[str] = Query(None, min_length=1, description="Name prefix"),
+    session: AsyncSession = Depends(get_session)
+):
+    # Pages over the in-process catalog, so a warm list costs no SQL at all:
+    # a bisect to the cursor, then a slice, or a scan from there when filtering.
+    await province_catalog.ensure_loaded(session)
+    entries = province_catalog.all()
+    after_id = decode_cursor(cursor)
+    start = bisect_right(entries, after_id, key=lambda p: p.id) if after_id is not None else 0
+    if is_secondary is None and not province_name:
+        provinces = list(entries[start:start + limit + 1])
+    else:
+        matches = (
+            p for p in map(entries.__getitem__, range(start, len(entries)))
+            if (is_secondary is None or p.is_secondary == is_secondary)
+            and (not province_name or p.province_name.startswith(province_name))
+        )
+        provinces = list(islice(matches, limit + 1))
+    if len(provinces) > limit:
+        provinces = provinces[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(provinces[-1].id)
+    if settings.FAST_JSON_RESPONSES:
+        return fast_json([_province_payload(p) for p in provinces], response)
     return [_province_with_tax(p) for p in provinces]
 
 
@@ -59,17 +159,15 @@ async def update_province(
     province_in: ProvinceUpdate,
     session: AsyncSession = Depends(get_session)
 ):
-    province = await session.get(DBProvince, province_id)
+    update_data = province_in.model_dump(exclude_unset=True)  # Pydantic v2
+    province = await ProvinceRepository(session).update(province_id, update_data)
     if not province:
         raise HTTPException(status_code=404, detail="Province not found")
 
-    update_data = province_in.model_dump(exclude_unset=True)  # Pydantic v2
-    for key, value in update_data.items():
-        setattr(province, key, value)
-
-    session.add(province)
+    version = await bump_cache_version(session, PROVINCES)
     await session.commit()
-    await session.refresh(province)
+    province_catalog.put(province, version)
+    cache_coherence.observe(PROVINCES, version)
     return _province_with_tax(province)
 
 
@@ -83,5 +181,8 @@ async def delete_province(
         raise HTTPException(status_code=404, detail="Province not found")
 
     await session.delete(province)
+    version = await bump_cache_version(session, PROVINCES)
     await session.commit()
+    province_catalog.remove(province_id, version)
+    cache_coherence.observe(PROVINCES, version)
     return Response(status_code=204)
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Annotated
+
+from app.models import get_session
+from app.models.tax import TaxQuoteRequest, TaxQuoteResponse
+from app.core.catalog import province_catalog
+from app.core.deps import get_current_active_user
+from app.core.principals import Principal
+from app.core.tax import get_rate_table
+from app.core.responses import fast_json
+from app.core import config
+
+router = APIRouter(prefix="/tax", tags=["tax"])
+settings = config.settings
+
+
+@router.post("/quotes", response_model=TaxQuoteResponse)
+async def create_tax_quotes(
+    quote_in: TaxQuoteRequest,
+    current_user: Annotated[Principal, Depends(get_current_active_user)],
+    session: AsyncSession = Depends(get_session)
+):
+    await province_catalog.ensure_loaded(session)
+    province_ids = [item.province_id for item in quote_in.items]
+    amounts = [item.amount for item in quote_in.items]
+    rates, reductions = get_rate_table().quote(province_ids, amounts)
+
+    # Plain dicts in TaxQuote field order: the batch is validated once on the way
+    # out through response_model, or not at all with FAST_JSON_RESPONSES.
+    quotes = {"quotes": [
+        {
+            "province_id": province_id,
+            "amount": amount,
+            "tax_reduction": rate,
+            "reduction_amount": reduction,
+        }
+        for province_id, amount, rate, reduction in zip(province_ids, amounts, rates, reductions)
+    ]}
+    if settings.FAST_JSON_RESPONSES:
+        return fast_json(quotes)
+    return quotes
@@ -1,27 +1,131 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import select
+from sqlmodel import select, update
+from sqlalchemy import String, cast
+from sqlalchemy.exc import IntegrityError
 import datetime
-from typing import Annotated
+from typing import Annotated, Optional
 
 from app.models.user_model import (
-    DBUser, RegisteredUser, User, Login, UpdatedUser, ChangedPassword
+    DBUser, RegisteredUser, User, UserList, Login, UpdatedUser, ChangedPassword
 )
-from app.models.province import DBProvince
 from app.models import get_session
-from app.core.deps import get_current_active_user
+from app.models.province import DBProvince, ProvinceSummary
+from app.models.token_model import DBRefreshToken
+from app.models.repository import UserRepository
+from app.models.identifiers import (
+    IdentifierConflict, authenticate_user, find_identifier_conflicts
+)
+from app.core.deps import RoleChecker, get_current_active_user
+from app.core.hashing import hasher
+from app.core.principals import Principal, principal_cache
+from app.core.catalog import province_catalog
+from app.core.coherence import PRINCIPALS, bump_cache_version, cache_coherence
+from app.core.tax import province_rate
+from app.core.responses import fast_json
+from app.core.rate_limit import enforce_login_throttle
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.core import config
 
 router = APIRouter(prefix="/users", tags=["users"])
+settings = config.settings
+
+_USER_FIELDS = tuple(name for name in User.model_fields if name != "selected_province")
+_PROVINCE_FIELDS = tuple(ProvinceSummary.model_fields)
+
+# Only what User renders: hashed_password and roles are never selected.
+_LIST_COLUMNS = tuple(getattr(DBUser, name) for name in _USER_FIELDS)
+_LIST_PROVINCE_COLUMNS = tuple(
+    getattr(DBProvince, name).label(f"province_{name}") for name in _PROVINCE_FIELDS
+)
+
+
+def _user_response(user: DBUser):
+    # Skips building a User model when fast responses are on; the keys follow
+    # User's field order so the bytes match the response_model path.
+    if settings.FAST_JSON_RESPONSES:
+        payload = {name: getattr(user, name) for name in _USER_FIELDS}
+        # __dict__ rather than getattr so an unloaded relationship never lazy-loads.
+        province = user.__dict__.get("selected_province")
+        payload["selected_province"] = (
+            {name: getattr(province, name) for name in _PROVINCE_FIELDS} if province else None
+        )
+        return fast_json(payload)
+    return user
+
+async def _raise_write_miss(session: AsyncSession, user_id: int, forbidden_detail: str):
+    # Only reached when an owner-scoped UPDATE matched nothing.
+    if not await UserRepository(session).exists(user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    raise HTTPException(status_code=403, detail=forbidden_detail)
+
+async def _with_catalog_province(session: AsyncSession, user: DBUser) -> User:
+    # Users from UPDATE ... RETURNING arrive without the joined province; the
+    # catalog supplies it without another statement once it is warm.
+    response = User.model_validate(user)
+    if user.selected_province_id is not None:
+        await province_catalog.ensure_loaded(session)
+        entry = province_catalog.get(user.selected_province_id)
+        response.selected_province = ProvinceSummary.model_validate(entry) if entry else None
+    return response
+
+def _raise_identifier_conflict(fields):
+    if "email" in fields or "phone_number" in fields:
+        raise HTTPException(status_code=400, detail="Email or phone already registered")
+    raise HTTPException(status_code=400, detail="Username already registered")
+
+def _listed_user(row) -> dict:
+    payload = {name: row[name] for name in _USER_FIELDS}
+    payload["selected_province"] = (
+        {name: row[f"province_{name}"] for name in _PROVINCE_FIELDS}
+        if row["province_id"] is not None else None
+    )
+    return payload
+
+# List users - admin เท่านั้น
+@router.get("/", response_model=UserList, dependencies=[Depends(RoleChecker("admin"))])
+async def list_users(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    role: Optional[str] = Query(None, pattern=r"^[A-Za-z0-9_-]+$"),
+    province_id: Optional[int] = None,
+    registered_from: Optional[datetime.datetime] = None,
+    registered_to: Optional[datetime.datetime] = None,
+    session: AsyncSession = Depends(get_session)
+):
+    q = select(*_LIST_COLUMNS, *_LIST_PROVINCE_COLUMNS).outerjoin(
+        DBProvince, DBProvince.id == DBUser.selected_province_id
+    )
+    after_id = decode_cursor(cursor)
+    if after_id is not None:
+        q = q.where(DBUser.id > after_id)
+    if role:
+        # roles is a JSON list; matching the quoted name works on any backend's text form.
+        q = q.where(cast(DBUser.roles, String).contains(f'"{role}"', autoescape=True))
+    if province_id is not None:
+        q = q.where(DBUser.selected_province_id == province_id)
+    if registered_from is not None:
+        q = q.where(DBUser.register_date >= registered_from)
+    if registered_to is not None:
+        q = q.where(DBUser.register_date < registered_to)
+    q = q.order_by(DBUser.id).limit(limit + 1)
+
+    rows = (await session.exec(q)).mappings().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1]["id"])
+    users = [_listed_user(row) for row in rows]
+    if settings.FAST_JSON_RESPONSES:
+        return fast_json({"users": users}, response)
+    return {"users": users}
 
 # Register - ไม่ต้องล็อกอิน
 @router.post("/register", response_model=User)
 async def register(user_in: RegisteredUser, session: AsyncSession = Depends(get_session)):
-    q = select(DBUser).where(
-        (DBUser.email == user_in.email) | (DBUser.phone_number == user_in.phone_number)
-    )
-    result = await session.exec(q)
-    if result.first():
-        raise HTTPException(status_code=400, detail="Email or phone already registered")
+    conflicts = await find_identifier_conflicts(session, user_in.model_dump())
+    if conflicts:
+        _raise_identifier_conflict(conflicts)
 
     user = DBUser(
         email=user_in.email,
@@ -31,24 +135,26 @@ async def register(user_in: RegisteredUser, session: AsyncSession = Depends(get_
         last_name=user_in.last_name,
         roles=[]
     )
-    user.set_password(user_in.password)
+    await user.set_password_async(user_in.password)
     user.register_date = datetime.datetime.now(datetime.timezone.utc)
 
     session.add(user)
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        # A concurrent registration claimed the same email or phone.
+        await session.rollback()
+        _raise_identifier_conflict(["email"])
     await session.refresh(user)
     return user
 
 
 # Login - (ถ้าต้องการ ใช้ /token แทน)
 @router.post("/login")
-async def login(login_in: Login, session: AsyncSession = Depends(get_session)):
-    q = select(DBUser).where(
-        (DBUser.email == login_in.identifier) | (DBUser.phone_number == login_in.identifier)
-    )
-    result = await session.exec(q)
-    user = result.first()
-    if not user or not user.verify_password(login_in.password):
+async def login(request: Request, login_in: Login, session: AsyncSession = Depends(get_session)):
+    enforce_login_throttle(request, login_in.identifier)
+    user = await authenticate_user(session, login_in.identifier, login_in.password)
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     return {"message": "Login success", "user_id": user.id}
 
@@ -56,22 +162,26 @@ async def login(login_in: Login, session: AsyncSession = Depends(get_session)):
 # Get current user profile - ต้องล็อกอิน
 @router.get("/me", response_model=User)
 async def read_users_me(
-    current_user: Annotated[DBUser, Depends(get_current_active_user)]
+    current_user: Annotated[Principal, Depends(get_current_active_user)],
+    session: AsyncSession = Depends(get_session)
 ):
-    return current_user
+    user = await session.get(DBUser, current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return _user_response(user)
 
 
 # Get user by id - ต้องล็อกอิน
 @router.get("/{user_id}", response_model=User)
 async def get_user(
     user_id: int,
-    current_user: Annotated[DBUser, Depends(get_current_active_user)],
+    current_user: Annotated[Principal, Depends(get_current_active_user)],
     session: AsyncSession = Depends(get_session)
 ):
     user = await session.get(DBUser, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return _user_response(user)
 
 
 # Update user - ต้องล็อกอิน
@@ -79,27 +189,23 @@ async def get_user(
 async def update_user(
     user_id: int,
     user_in: UpdatedUser,
-    current_user: Annotated[DBUser, Depends(get_current_active_user)],
+    current_user: Annotated[Principal, Depends(get_current_active_user)],
     session: AsyncSession = Depends(get_session)
 ):
-    user = await session.get(DBUser, user_id)
+    try:
+        user = await UserRepository(session).update_profile(
+            user_id, current_user.id, user_in.model_dump(exclude_unset=True)
+        )
+    except IdentifierConflict as exc:
+        _raise_identifier_conflict(exc.fields)
     if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # (ถ้าต้องการ) ตรวจสอบสิทธิ์ว่า user ตัวเอง หรือ admin ถึงจะแก้ไขได้
-    if user.id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to update this user")
-
-    user_data = user_in.dict(exclude_unset=True)
-    for key, value in user_data.items():
-        setattr(user, key, value)
-
-    user.updated_date = datetime.datetime.now(datetime.timezone.utc)
-    session.add(user)
+        await _raise_write_miss(session, user_id, "Not authorized to update this user")
+    version = await bump_cache_version(session, PRINCIPALS)
     await session.commit()
-    await session.refresh(user)
+    principal_cache.invalidate(user.id)
+    cache_coherence.observe(PRINCIPALS, version)
 
-    return user
+    return await _with_catalog_province(session, user)
 
 
 # Change password - ต้องล็อกอิน
@@ -107,23 +213,28 @@ async def update_user(
 async def change_password(
     user_id: int,
     pw: ChangedPassword,
-    current_user: Annotated[DBUser, Depends(get_current_active_user)],
+    current_user: Annotated[Principal, Depends(get_current_active_user)],
     session: AsyncSession = Depends(get_session)
 ):
-    user = await session.get(DBUser, user_id)
-    if not user:
+    users = UserRepository(session)
+    current_hash = await users.get_password_hash(user_id)
+    if current_hash is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if user.id != current_user.id:
+    if user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to change password for this user")
 
-    if not user.verify_password(pw.current_password):
+    if not await hasher.verify(pw.current_password, current_hash):
         raise HTTPException(status_code=400, detail="Current password incorrect")
 
-    user.set_password(pw.new_password)
-    user.updated_date = datetime.datetime.now(datetime.timezone.utc)
-    session.add(user)
+    new_hash = await hasher.hash(pw.new_password)
+    if not await users.replace_password_hash(user_id, current_user.id, current_hash, new_hash):
+        # Someone else changed the password between our read and write.
+        raise HTTPException(status_code=400, detail="Current password incorrect")
+    version = await bump_cache_version(session, PRINCIPALS)
     await session.commit()
+    principal_cache.invalidate(user_id)
+    cache_coherence.observe(PRINCIPALS, version)
 
     return {"message": "Password changed successfully"}
 
@@ -132,7 +243,7 @@ async def change_password(
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
-    current_user: Annotated[DBUser, Depends(get_current_active_user)],
+    current_user: Annotated[Principal, Depends(get_current_active_user)],
     session: AsyncSession = Depends(get_session)
 ):
     user = await session.get(DBUser, user_id)
@@ -143,8 +254,18 @@ async def delete_user(
     if user.id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this user")
 
+    # SQLite does not enforce the refresh_tokens foreign key and may hand this id
+    # to the next user registered, so the user's refresh tokens are revoked here.
+    await session.exec(
+        update(DBRefreshToken)
+        .where(DBRefreshToken.user_id == user_id, DBRefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.datetime.now(datetime.timezone.utc))
+    )
     await session.delete(user)
+    version = await bump_cache_version(session, PRINCIPALS)
     await session.commit()
+    principal_cache.invalidate(user_id)
+    cache_coherence.observe(PRINCIPALS, version)
     return
 
 
@@ -152,10 +273,11 @@ async def delete_user(
 @router.get("/{user_id}/tax-info")
 async def get_user_tax_info(
     user_id: int,
-    current_user: Annotated[DBUser, Depends(get_current_active_user)],
+    current_user: Annotated[Principal, Depends(get_current_active_user)],
     session: AsyncSession = Depends(get_session)
 ):
-    user = await session.get(DBUser, user_id)
+    # populate_existing refreshes the joined province even if the user is already in the session.
+    user = await session.get(DBUser, user_id, populate_existing=True)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -165,7 +287,7 @@ async def get_user_tax_info(
     if not user.selected_province_id:
         raise HTTPException(status_code=400, detail="User has not selected a province")
 
-    province = await session.get(DBProvince, user.selected_province_id)
+    province = user.selected_province
     if not province:
         raise HTTPException(status_code=404, detail="Province not found")
 
@@ -173,7 +295,7 @@ async def get_user_tax_info(
         "user_id": user.id,
         "province_name": province.province_name,
         "is_secondary": province.is_secondary,
-        "tax_reduction": 0.2 if province.is_secondary else 0.1
+        "tax_reduction": province_rate(province)
     }
 
 
@@ -182,23 +304,16 @@ async def get_user_tax_info(
 async def select_province(
     user_id: int,
     province_id: int,
-    current_user: Annotated[DBUser, Depends(get_current_active_user)],
+    current_user: Annotated[Principal, Depends(get_current_active_user)],
     session: AsyncSession = Depends(get_session)
 ):
-    user = await session.get(DBUser, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    if user.id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to select province for this user")
-
-    province = await session.get(DBProvince, province_id)
+    await province_catalog.ensure_loaded(session)
+    province = province_catalog.get(province_id)
     if not province:
         raise HTTPException(status_code=404, detail="Province not found")
 
-    user.selected_province_id = province_id
-    session.add(user)
+    if not await UserRepository(session).select_province(user_id, current_user.id, province_id):
+        await _raise_write_miss(session, user_id, "Not authorized to select province for this user")
     await session.commit()
-    await session.refresh(user)
 
-    return {"message": f"User {user.id} selected province {province.province_name}"}
+    return {"message": f"User {user_id} selected province {province.province_name}"}
@@ -0,0 +1,193 @@
+"""Latency and throughput benchmarks for the main API endpoints.
+
+Drives the real ``app.main.app`` in-process over httpx's ASGI transport,
+against a freshly seeded SQLite database, at several concurrency levels.
+
+    python -m benchmarks.endpoints --save benchmarks/baseline.json
+    python -m benchmarks.endpoints --compare benchmarks/baseline.json --threshold 0.25
+
+With --compare the exit status is 1 when any scenario returned errors, or
+its p95 latency grew, or its requests per second dropped, by more than the
+threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_CONCURRENCY = (1, 8, 32)
+PASSWORD = "benchmark-password"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Linearly interpolated percentile of an already sorted list, q in [0, 100]."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "rps": round(len(ordered) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Describe every scenario that errored or whose p95 or throughput regressed beyond threshold."""
+    regressions = []
+    for name, result in current.items():
+        # Latencies of rejected requests say nothing about the endpoint.
+        if result.get("errors"):
+            regressions.append(f"{name}: {result['errors']} of {result['requests']} requests failed")
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if base["p95_ms"] > 0 and result["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']:.2f}ms vs baseline {base['p95_ms']:.2f}ms"
+            )
+        if base["rps"] > 0 and result["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{name}: {result['rps']:.1f} rps vs baseline {base['rps']:.1f} rps")
+    return regressions
+
+
+async def run_load(client, request_kwargs: dict, concurrency: int, total: int) -> Dict[str, float]:
+    """Issue total requests from concurrency workers and summarize latencies."""
+    latencies: List[float] = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await client.request(**request_kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def _seed(models, provinces: int) -> int:
+    async with models.session_factory() as session:
+        session.add_all(
+            models.DBProvince(province_name=f"Province {i:03d}", is_secondary=i % 3 == 0)
+            for i in range(provinces)
+        )
+        await session.commit()
+
+        user = models.DBUser(
+            email="bench@example.com",
+            phone_number="0800000000",
+            username="bench",
+            first_name="Bench",
+            last_name="User",
+            roles=[],
+            selected_province_id=1,
+        )
+        user.set_password(PASSWORD)
+        session.add(user)
+        await session.commit()
+        return user.id
+
+
+async def run(
+    concurrency_levels=DEFAULT_CONCURRENCY,
+    requests: int = 200,
+    token_requests: int = 20,
+    provinces: int = 77,
+) -> Dict[str, dict]:
+    import httpx
+    from app import models
+    from app.core.catalog import province_catalog
+    from app.main import app
+
+    results: Dict[str, dict] = {}
+    async with app.router.lifespan_context(app):
+        user_id = await _seed(models, provinces)
+        # Seeding bypasses the routers, so drop the catalog loaded at startup.
+        province_catalog.invalidate()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            login = {"username": "bench", "password": PASSWORD}
+            token = (await client.post("/token", data=login)).json()["access_token"]
+            auth = {"Authorization": f"Bearer {token}"}
+
+            scenarios = {
+                "token": ({"method": "POST", "url": "/token", "data": login}, token_requests),
+                "users_me": ({"method": "GET", "url": "/users/me", "headers": auth}, requests),
+                "tax_info": (
+                    {"method": "GET", "url": f"/users/{user_id}/tax-info", "headers": auth},
+                    requests,
+                ),
+                "provinces": ({"method": "GET", "url": "/provinces/"}, requests),
+            }
+            for name, (request_kwargs, total) in scenarios.items():
+                for concurrency in concurrency_levels:
+                    results[f"{name}@c{concurrency}"] = await run_load(
+                        client, request_kwargs, concurrency, total
+                    )
+    return results
+
+
+def _print_table(results: Dict[str, dict]) -> None:
+    print(f"{'scenario':<20}{'reqs':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}")
+    for name, r in results.items():
+        print(
+            f"{name:<20}{r['requests']:>6}{r['errors']:>5}{r['p50_ms']:>10.2f}"
+            f"{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['rps']:>10.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--token-requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="travel-bench-")
+    os.environ["SQLDB_URL"] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    # The token scenario logs one user in far faster than the login throttle allows.
+    os.environ["LOGIN_RATE_LIMIT_ENABLED"] = "false"
+
+    results = asyncio.run(
+        run(args.concurrency, requests=args.requests, token_requests=args.token_requests)
+    )
+    _print_table(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
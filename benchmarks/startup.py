@@ -0,0 +1,113 @@
+"""Cold-start benchmark: import time and time-to-first-request.
+
+Each run starts a fresh interpreter that imports ``app.main``, builds the app
+with ``create_app()``, runs its lifespan against a new SQLite file and serves
+one request over httpx's ASGI transport. Medians over the runs are reported.
+
+    python -m benchmarks.startup --save benchmarks/startup-baseline.json
+    python -m benchmarks.startup --compare benchmarks/startup-baseline.json --threshold 0.25
+
+With --compare the exit status is 1 when any phase's median grew by more
+than the threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.endpoints import percentile
+
+# Child runs report every phase relative to this, taken before app is imported.
+_STARTED = time.perf_counter()
+
+PHASES = ("import_ms", "create_app_ms", "lifespan_ms", "first_request_ms", "process_ms")
+
+
+async def _measure_child(started: float) -> Dict[str, float]:
+    marks = {}
+    import app.main
+    marks["import_ms"] = time.perf_counter()
+    application = app.main.create_app()
+    marks["create_app_ms"] = time.perf_counter()
+
+    import httpx
+    async with application.router.lifespan_context(application):
+        marks["lifespan_ms"] = time.perf_counter()
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/provinces/")
+            response.raise_for_status()
+        marks["first_request_ms"] = time.perf_counter()
+    # Each mark is reported as time since the interpreter reached this module.
+    return {name: round((mark - started) * 1000, 3) for name, mark in marks.items()}
+
+
+def run_once() -> Dict[str, float]:
+    """Measure one cold start in a fresh interpreter and database."""
+    workdir = tempfile.mkdtemp(prefix="travel-startup-")
+    env = dict(os.environ)
+    env["SQLDB_URL"] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'startup.db')}"
+    env.setdefault("SECRET_KEY", "benchmark-secret")
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child"],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def median_phases(samples: List[Dict[str, float]]) -> Dict[str, float]:
+    return {
+        phase: round(percentile(sorted(sample[phase] for sample in samples), 50), 3)
+        for phase in PHASES
+    }
+
+
+def compare(current: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """Describe every phase whose median grew beyond threshold."""
+    regressions = []
+    for phase, value in current.items():
+        base = baseline.get(phase)
+        if base and value > base * (1 + threshold):
+            regressions.append(f"{phase}: {value:.1f}ms vs baseline {base:.1f}ms")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(asyncio.run(_measure_child(_STARTED))))
+        return 0
+
+    results = median_phases([run_once() for _ in range(args.runs)])
+    for phase in PHASES:
+        print(f"{phase:<20}{results[phase]:>10.1f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
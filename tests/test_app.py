@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import pytest
+import httpx
+from httpx import AsyncClient
+
+from app.core import config
+from app.main import create_app
+
+
+@pytest.fixture
+def restore_settings():
+    yield
+    config.configure(None)
+
+
+def test_importing_app_needs_no_environment():
+    env = {k: v for k, v in os.environ.items() if k not in ("SQLDB_URL", "SECRET_KEY")}
+    subprocess.run(
+        [sys.executable, "-c", "import app.main, app.core.deps, app.core.security"],
+        env=env, check=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_app_uses_given_settings(restore_settings):
+    settings = config.Settings(SQLDB_URL="sqlite+aiosqlite://", SECRET_KEY="factory", METRICS_ENABLED=False)
+    application = create_app(settings)
+    assert config.settings.SECRET_KEY == "factory"
+
+    transport = httpx.ASGITransport(app=application)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get("/openapi.json")
+        second = await client.get("/openapi.json")
+    assert first.status_code == 200
+    assert first.json()["info"]["title"] == "Travel API"
+    assert first.content == second.content
+    assert [r.path for r in application.routes].count("/openapi.json") == 1
+
+
+def test_create_app_twice_rebuilds_singletons(restore_settings):
+    from types import SimpleNamespace
+    from app.core.hashing import hasher
+    from app.core.tax import tax_rules
+
+    province = SimpleNamespace(province_name="Nan", is_secondary=False)
+    for workers, rate, secret in ((2, 0.1, "first"), (8, 0.3, "second")):
+        create_app(config.Settings(
+            SQLDB_URL="sqlite+aiosqlite://",
+            SECRET_KEY=secret,
+            PASSWORD_HASHER_MAX_WORKERS=workers,
+            TAX_RULES=config.TaxRules(primary_rate=rate),
+        ))
+        assert config.settings.SECRET_KEY == secret
+        assert hasher.max_workers == workers
+        assert tax_rules.rate_for(province) == rate
@@ -0,0 +1,49 @@
+from benchmarks.endpoints import compare, percentile, summarize
+
+
+def test_percentile_interpolates():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile([], 99) == 0.0
+
+
+def test_summarize_reports_ms_and_rps():
+    result = summarize([0.01] * 10, elapsed=0.5, errors=1)
+    assert result["p50_ms"] == 10.0
+    assert result["rps"] == 20.0
+    assert result["errors"] == 1
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = {
+        "users_me@c1": {"p95_ms": 10.0, "rps": 100.0},
+        "provinces@c1": {"p95_ms": 10.0, "rps": 100.0},
+    }
+    current = {
+        "users_me@c1": {"p95_ms": 12.0, "rps": 95.0},
+        "provinces@c1": {"p95_ms": 20.0, "rps": 50.0},
+        "new@c1": {"p95_ms": 1.0, "rps": 1.0},
+    }
+    regressions = compare(current, baseline, threshold=0.25)
+    assert len(regressions) == 2
+    assert all(r.startswith("provinces@c1") for r in regressions)
+
+
+def test_compare_flags_scenarios_with_errors():
+    current = {"token@c1": {"requests": 10, "errors": 6, "p95_ms": 1.0, "rps": 100.0}}
+    baseline = {"token@c1": {"p95_ms": 1.0, "rps": 100.0}}
+    assert compare(current, baseline, threshold=0.25) == ["token@c1: 6 of 10 requests failed"]
+
+
+def test_startup_medians_and_regressions():
+    from benchmarks.startup import PHASES, compare as compare_startup, median_phases
+
+    samples = [{phase: value for phase in PHASES} for value in (10.0, 30.0, 20.0)]
+    medians = median_phases(samples)
+    assert medians == {phase: 20.0 for phase in PHASES}
+
+    baseline = dict(medians, import_ms=10.0)
+    regressions = compare_startup(medians, baseline, threshold=0.25)
+    assert regressions == ["import_ms: 20.0ms vs baseline 10.0ms"]
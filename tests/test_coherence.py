@@ -0,0 +1,123 @@
+import subprocess
+import sys
+import textwrap
+
+import pytest
+import pytest_asyncio
+from sqlmodel import SQLModel
+
+from app.models.province import DBProvince
+from app.core.catalog import ProvinceCatalog
+from app.core.coherence import PRINCIPALS, PROVINCES, CacheCoherence, bump_cache_version
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+import os
+from dotenv import load_dotenv
+
+# ---------- FIXTURES ----------
+
+@pytest_asyncio.fixture
+async def engine():
+    """Create test database engine."""
+    load_dotenv(dotenv_path=".env.test")
+    sql_url = os.getenv("SQLDB_URL")
+    engine = create_async_engine(
+        sql_url,
+        connect_args=(
+            {"check_same_thread": False} if sql_url.startswith("sqlite") else {}
+        ),
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session(engine):
+    """Create test database session."""
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        yield session
+
+
+def _run_other_worker(script: str) -> None:
+    """Run script in a separate interpreter against the same database."""
+    prelude = textwrap.dedent("""
+        import asyncio, os
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from sqlmodel.ext.asyncio.session import AsyncSession
+        from app.models.province import DBProvince
+        from app.core.coherence import bump_cache_version
+
+        async def main():
+            engine = create_async_engine(os.environ["SQLDB_URL"])
+            async with AsyncSession(engine) as session:
+    """)
+    epilogue = textwrap.dedent("""
+                await session.commit()
+            await engine.dispose()
+
+        asyncio.run(main())
+    """)
+    body = textwrap.indent(textwrap.dedent(script), " " * 8)
+    subprocess.run([sys.executable, "-c", prelude + body + epilogue], check=True)
+
+# ---------- TEST CASES ----------
+
+@pytest.mark.asyncio
+async def test_write_in_another_process_invalidates_local_catalog(session):
+    province = DBProvince(province_name="Old Name", is_secondary=False)
+    session.add(province)
+    await session.commit()
+
+    catalog = ProvinceCatalog()
+    await catalog.load(session)
+    coherence = CacheCoherence(interval=60)
+    coherence.register(PROVINCES, lambda session: catalog.invalidate())
+    assert await coherence.check(session) == []
+
+    _run_other_worker(f"""
+        province = await session.get(DBProvince, {province.id})
+        province.province_name = "New Name"
+        await bump_cache_version(session, "provinces")
+    """)
+
+    assert catalog.get(province.id).province_name == "Old Name"
+    assert await coherence.check(session) == [PROVINCES]
+    # The next request reloads through its own session.
+    session.expunge_all()
+    await catalog.ensure_loaded(session)
+    assert catalog.get(province.id).province_name == "New Name"
+    assert await coherence.check(session) == []
+
+
+@pytest.mark.asyncio
+async def test_own_writes_do_not_invalidate(session):
+    cleared = []
+    coherence = CacheCoherence(interval=60)
+    coherence.register(PRINCIPALS, cleared.append)
+    await bump_cache_version(session, PRINCIPALS)
+    await session.commit()
+    await coherence.check(session)
+
+    version = await bump_cache_version(session, PRINCIPALS)
+    await session.commit()
+    assert version == 2
+    coherence.observe(PRINCIPALS, version)
+    assert await coherence.check(session) == []
+
+    _run_other_worker("""
+        await bump_cache_version(session, "principals")
+    """)
+    # A concurrent foreign bump means our own observe must not paper over it.
+    version = await bump_cache_version(session, PRINCIPALS)
+    await session.commit()
+    coherence.observe(PRINCIPALS, version)
+    assert await coherence.check(session) == [PRINCIPALS]
+    assert len(cleared) == 1
@@ -0,0 +1,44 @@
+import pytest
+from sqlmodel import select
+
+from app import models
+from app.core.config import Settings
+from app.core.metrics import db_pool_checkout_wait
+
+
+@pytest.mark.asyncio
+async def test_init_db_builds_engine_from_settings(tmp_path):
+    settings = Settings(
+        SQLDB_URL=f"sqlite+aiosqlite:///{tmp_path / 'app.db'}",
+        SECRET_KEY="secret",
+        SQLDB_POOL_SIZE=3,
+        SQLDB_ECHO=False,
+    )
+    await models.init_db(settings)
+    try:
+        assert models.engine.echo is False
+        assert models.engine.pool.size() == 3
+
+        factory = models.session_factory
+        checkouts = db_pool_checkout_wait.count()
+        async for session in models.get_session():
+            assert isinstance(session, models.AsyncSession)
+            await session.exec(select(models.DBProvince))
+        assert models.session_factory is factory
+        assert db_pool_checkout_wait.count() == checkouts + 1
+    finally:
+        await models.close_db()
+
+    assert models.engine is None
+    assert models.session_factory is None
+
+
+@pytest.mark.asyncio
+async def test_init_db_in_memory_sqlite():
+    settings = Settings(SQLDB_URL="sqlite+aiosqlite://", SECRET_KEY="secret")
+    await models.init_db(settings)
+    try:
+        async for session in models.get_session():
+            assert session.bind is models.engine
+    finally:
+        await models.close_db()
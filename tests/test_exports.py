@@ -0,0 +1,140 @@
+import csv
+import datetime
+import io
+import json
+
+import pytest
+import pytest_asyncio
+import httpx
+from httpx import AsyncClient
+from app.main import app
+from sqlmodel import SQLModel
+
+from app.models import get_session
+from app.models.province import DBProvince
+from app.models.user_model import DBUser
+from app.core.catalog import province_catalog
+from app.core.deps import get_current_active_user
+from app.core.exports import stream_table
+from app.core.principals import Principal
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+import os
+from dotenv import load_dotenv
+
+# ---------- FIXTURES ----------
+
+@pytest_asyncio.fixture
+async def engine():
+    """Create test database engine."""
+    load_dotenv(dotenv_path=".env.test")
+    sql_url = os.getenv("SQLDB_URL")
+    engine = create_async_engine(
+        sql_url,
+        connect_args=(
+            {"check_same_thread": False} if sql_url.startswith("sqlite") else {}
+        ),
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    province_catalog.invalidate()
+
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session(engine):
+    """Create test database session."""
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def users(session):
+    """Create a handful of users to export."""
+    users = [
+        DBUser(
+            email=f"export{i}@example.com",
+            phone_number=f"88888888{i}",
+            username=f"export{i}",
+            first_name="Export",
+            last_name=str(i),
+            roles=["admin"] if i == 0 else [],
+            hashed_password="secret-hash",
+            register_date=datetime.datetime(2024, 1, 1 + i),
+        )
+        for i in range(5)
+    ]
+    session.add_all(users)
+    session.add(DBProvince(province_name="Nan", is_secondary=True))
+    await session.commit()
+    return users
+
+
+def _client_with(session, principal):
+    async def get_session_override():
+        yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_active_user] = lambda: principal
+    return AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest_asyncio.fixture
+async def admin_client(session):
+    async with _client_with(session, Principal(id=1, roles=("admin",))) as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def normal_client(session):
+    async with _client_with(session, Principal(id=1, roles=())) as client:
+        yield client
+    app.dependency_overrides.clear()
+
+# ---------- TEST CASES ----------
+
+@pytest.mark.asyncio
+async def test_export_users_ndjson_resumes_from_checkpoint(admin_client, users):
+    response = await admin_client.get("/exports/users")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [user.id for user in users]
+    assert "hashed_password" not in rows[0]
+    assert rows[0]["roles"] == ["admin"]
+
+    response = await admin_client.get("/exports/users", params={"after_id": users[2].id})
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [
+        users[3].id, users[4].id
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_provinces_csv(admin_client, users):
+    response = await admin_client.get("/exports/provinces", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="provinces.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert rows == [{"id": "1", "province_name": "Nan", "is_secondary": "True"}]
+
+
+@pytest.mark.asyncio
+async def test_export_requires_admin(normal_client):
+    response = await normal_client.get("/exports/users")
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_stream_table_yields_one_chunk_per_batch(engine, users):
+    columns = (DBUser.__table__.c.id, DBUser.__table__.c.username)
+    chunks = [chunk async for chunk in stream_table(engine, columns, "ndjson", batch_size=2)]
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
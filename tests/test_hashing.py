@@ -0,0 +1,29 @@
+import pytest
+
+from app.core.hashing import PasswordHasher
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_roundtrip():
+    hasher = PasswordHasher(max_workers=2)
+    hashed = await hasher.hash("password123")
+    assert await hasher.verify("password123", hashed)
+    assert not await hasher.verify("wrong", hashed)
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_stats_track_completed_calls():
+    hasher = PasswordHasher(max_workers=1)
+    hashed = await hasher.hash("password123")
+    await hasher.verify("password123", hashed)
+    stats = hasher.stats()
+    assert stats["completed"] == 2
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+    hasher.shutdown()
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        PasswordHasher(backend="gpu")
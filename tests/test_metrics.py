@@ -0,0 +1,58 @@
+import pytest
+import httpx
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.main import app
+from app.core.metrics import (
+    Counter, Histogram, db_statements, http_request_duration, instrument_engine
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+
+    lines = list(histogram.render())
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+    assert histogram.count("/a") == 3
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("events_total", "Events.", ("name",))
+    counter.inc('say "hi"')
+    assert 'events_total{name="say \\"hi\\""} 1.0' in list(counter.render())
+
+
+@pytest.mark.asyncio
+async def test_instrumented_engine_counts_statements():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument_engine(engine)
+    before = db_statements.value("SELECT")
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        await conn.execute(text("select 2"))
+    await engine.dispose()
+    assert db_statements.value("SELECT") == before + 2
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_route_templates():
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        before = http_request_duration.count("GET", "/", "200")
+        await client.get("/")
+        assert http_request_duration.count("GET", "/", "200") == before + 1
+
+        response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert '# TYPE http_request_duration_seconds histogram' in response.text
+    assert 'route="/"' in response.text
+    assert "province_catalog_hits" in response.text
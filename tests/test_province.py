@@ -13,6 +13,10 @@ from dotenv import load_dotenv
 from app.models import get_session
 from app.models.province import DBProvince
 from app.models.user_model import DBUser
+from app.core import config
+from app.core.catalog import province_catalog
+from app.core.coherence import PROVINCES, bump_cache_version
+from app.core.query_budget import assert_query_count
 from app.core.deps import get_current_active_user, get_current_user, RoleChecker
 
 
@@ -28,6 +32,7 @@ async def engine():
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.drop_all)
         await conn.run_sync(SQLModel.metadata.create_all)
+    province_catalog.invalidate()
     yield engine
     await engine.dispose()
 
@@ -199,7 +204,9 @@ async def test_list_provinces(admin_client, test_province):
 async def test_update_province(admin_client, test_province):
     """Test updating a province with admin client."""
     update_data = {"province_name": "Updated Province", "is_secondary": False}
-    response = await admin_client.put(f"/provinces/{test_province.id}", json=update_data)
+    await admin_client.put(f"/provinces/{test_province.id}", json={"is_secondary": True})
+    with assert_query_count(2):
+        response = await admin_client.put(f"/provinces/{test_province.id}", json=update_data)
     assert response.status_code == 200
     result = response.json()
     assert result["province_name"] == update_data["province_name"]
@@ -243,4 +250,247 @@ async def test_delete_province_not_found(admin_client):
 async def test_delete_province_unauthenticated(normal_client, test_province):
     """Test deleting a province with normal user (should fail)."""
     response = await normal_client.delete(f"/provinces/{test_province.id}")
-    assert response.status_code == 401 or response.status_code == 403
\ No newline at end of file
+    assert response.status_code == 401 or response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_province_reads_served_from_catalog(admin_client, test_province):
+    """Reads after the first load hit the catalog, and writes update it."""
+    original_name = test_province.province_name
+    await admin_client.get("/provinces/")
+    hits = province_catalog.hits
+
+    response = await admin_client.get(f"/provinces/{test_province.id}")
+    assert response.status_code == 200
+    assert province_catalog.hits == hits + 1
+    assert province_catalog.stats()["size"] == 1
+
+    await admin_client.put(f"/provinces/{test_province.id}", json={"province_name": "Renamed"})
+    assert province_catalog.get_by_name("Renamed").id == test_province.id
+    assert province_catalog.get_by_name(original_name) is None
+
+    await admin_client.delete(f"/provinces/{test_province.id}")
+    assert province_catalog.get(test_province.id) is None
+
+
+@pytest.mark.asyncio
+async def test_catalog_keeps_entries_sorted_by_id(admin_client, session):
+    for name in ["Krabi", "Nan", "Phrae"]:
+        session.add(DBProvince(province_name=name, is_secondary=True))
+    await session.commit()
+    await admin_client.get("/provinces/")
+    assert province_catalog.all() is province_catalog.all()
+
+    await admin_client.delete("/provinces/2")
+    await admin_client.post("/provinces/", json={"province_name": "Nan", "is_secondary": False})
+    assert [e.id for e in province_catalog.all()] == [1, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_list_provinces_keyset_pagination(admin_client, session):
+    for name in ["Krabi", "Nan", "Phrae", "Chiang Mai", "Chiang Rai"]:
+        session.add(DBProvince(province_name=name, is_secondary=name != "Chiang Mai"))
+    await session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await admin_client.get("/provinces/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 2
+        seen.extend(p["province_name"] for p in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert seen == ["Krabi", "Nan", "Phrae", "Chiang Mai", "Chiang Rai"]
+
+
+@pytest.mark.asyncio
+async def test_list_provinces_filters(admin_client, session):
+    for name in ["Chiang Mai", "Chiang Rai", "Chanthaburi", "Nan"]:
+        session.add(DBProvince(province_name=name, is_secondary=name != "Chiang Mai"))
+    await session.commit()
+
+    response = await admin_client.get("/provinces/", params={"province_name": "Chiang"})
+    assert [p["province_name"] for p in response.json()] == ["Chiang Mai", "Chiang Rai"]
+
+    response = await admin_client.get(
+        "/provinces/", params={"province_name": "Chiang", "is_secondary": True}
+    )
+    assert [p["province_name"] for p in response.json()] == ["Chiang Rai"]
+
+
+@pytest.mark.asyncio
+async def test_list_provinces_pages_warm_catalog_without_sql(admin_client, session):
+    for name in ["Chiang Mai", "Chiang Rai", "Chiang Saen", "Nan"]:
+        session.add(DBProvince(province_name=name, is_secondary=True))
+    await session.commit()
+    await admin_client.get("/provinces/")
+
+    with assert_query_count(0):
+        first = await admin_client.get("/provinces/", params={"province_name": "Chiang", "limit": 2})
+        rest = await admin_client.get(
+            "/provinces/", params={"province_name": "Chiang", "cursor": first.headers["X-Next-Cursor"]}
+        )
+    assert [p["province_name"] for p in first.json()] == ["Chiang Mai", "Chiang Rai"]
+    assert [p["province_name"] for p in rest.json()] == ["Chiang Saen"]
+    assert "X-Next-Cursor" not in rest.headers
+
+
+@pytest.mark.asyncio
+async def test_list_provinces_invalid_cursor(admin_client):
+    response = await admin_client.get("/provinces/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_returns_304(admin_client, test_province):
+    response = await admin_client.get(f"/provinces/{test_province.id}")
+    etag = response.headers["ETag"]
+    assert "max-age" in response.headers["Cache-Control"]
+
+    response = await admin_client.get(
+        f"/provinces/{test_province.id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    response = await admin_client.get("/provinces/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_after_write_returns_200(admin_client, test_province):
+    response = await admin_client.get("/provinces/")
+    etag = response.headers["ETag"]
+
+    await admin_client.put(f"/provinces/{test_province.id}", json={"is_secondary": False})
+
+    response = await admin_client.get("/provinces/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_etag_survives_reload(admin_client, test_province):
+    """The tag follows the shared version, so a restarted or other worker validates it."""
+    response = await admin_client.get("/provinces/")
+    etag = response.headers["ETag"]
+
+    province_catalog.invalidate()
+    response = await admin_client.get("/provinces/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_catalog_write_after_missed_version_reloads(admin_client, session, test_province):
+    await admin_client.get("/provinces/")
+    # Another worker's write the coherence check has not picked up yet.
+    await bump_cache_version(session, PROVINCES)
+    await session.commit()
+
+    await admin_client.put(f"/provinces/{test_province.id}", json={"is_secondary": False})
+    assert not province_catalog.loaded
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_csv(admin_client, test_province):
+    body = (
+        "province_name,is_secondary\n"
+        "Nan,true\n"
+        f"{test_province.province_name},false\n"
+        "Krabi,not-a-bool\n"
+        "Phrae,1\n"
+    )
+    response = await admin_client.post(
+        "/provinces/import", content=body, headers={"Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["inserted"], result["updated"], result["rejected"]) == (2, 1, 1)
+    assert result["errors"][0]["line"] == 4
+
+    response = await admin_client.get("/provinces/", params={"province_name": "Test"})
+    assert response.json()[0]["is_secondary"] is False
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_jsonl_batches(admin_client):
+    lines = [f'{{"province_name": "P{i:04d}", "is_secondary": {str(i % 2 == 0).lower()}}}' for i in range(1200)]
+    lines.append("{broken")
+
+    async def chunks():
+        body = "\n".join(lines).encode()
+        for start in range(0, len(body), 4096):
+            yield body[start:start + 4096]
+
+    response = await admin_client.post(
+        "/provinces/import", content=chunks(), headers={"Content-Type": "application/x-ndjson"}
+    )
+    result = response.json()
+    assert (result["inserted"], result["updated"], result["rejected"]) == (1200, 0, 1)
+
+    response = await admin_client.get("/provinces/", params={"limit": 500})
+    assert len(response.json()) == 500
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_failure_publishes_committed_batches(admin_client, monkeypatch):
+    monkeypatch.setattr(config.get_settings(), "PROVINCE_IMPORT_BATCH_SIZE", 2)
+    await admin_client.get("/provinces/")
+    version = province_catalog.version
+
+    async def disconnecting():
+        yield b"province_name,is_secondary\nKrabi,true\nNan,false\n"
+        raise ConnectionResetError("client went away")
+
+    with pytest.raises(ConnectionResetError):
+        await admin_client.post(
+            "/provinces/import", content=disconnecting(), headers={"Content-Type": "text/csv"}
+        )
+
+    assert province_catalog.version != version
+    response = await admin_client.get("/provinces/")
+    assert [p["province_name"] for p in response.json()] == ["Krabi", "Nan"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_unsupported_type(admin_client):
+    response = await admin_client.post(
+        "/provinces/import", content="x", headers={"Content-Type": "text/plain"}
+    )
+    assert response.status_code == 415
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_unauthenticated(normal_client):
+    response = await normal_client.post(
+        "/provinces/import", content="province_name,is_secondary\n", headers={"Content-Type": "text/csv"}
+    )
+    assert response.status_code == 401 or response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_fast_json_responses_are_byte_identical(admin_client, session, monkeypatch):
+    for name, is_secondary in [("Nan", True), ("Bangkok", False), ("เชียงใหม่", True)]:
+        session.add(DBProvince(province_name=name, is_secondary=is_secondary))
+    await session.commit()
+
+    monkeypatch.setattr(config.get_settings(), "FAST_JSON_RESPONSES", False)
+    slow_list = await admin_client.get("/provinces/", params={"limit": 2})
+    slow_one = await admin_client.get("/provinces/3")
+
+    monkeypatch.setattr(config.get_settings(), "FAST_JSON_RESPONSES", True)
+    fast_list = await admin_client.get("/provinces/", params={"limit": 2})
+    fast_one = await admin_client.get("/provinces/3")
+
+    assert fast_list.content == slow_list.content
+    assert fast_one.content == slow_one.content
+    assert fast_list.headers["X-Next-Cursor"] == slow_list.headers["X-Next-Cursor"]
+    assert fast_list.headers["ETag"] == slow_list.headers["ETag"]
+    assert fast_list.headers["content-type"] == slow_list.headers["content-type"]
@@ -0,0 +1,168 @@
+import logging
+
+import pytest
+import pytest_asyncio
+import httpx
+from httpx import AsyncClient
+from app.main import app
+from sqlmodel import SQLModel
+
+from app import models
+from app.models import get_session
+from app.models.province import DBProvince
+from app.models.user_model import DBUser
+from app.core import config
+from app.core.catalog import province_catalog
+from app.core.deps import get_current_active_user
+from app.core.principals import Principal
+from app.core.query_budget import (
+    QueryBudgetExceeded, QueryCounter, assert_query_count, count_queries
+)
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+import os
+from dotenv import load_dotenv
+
+# ---------- FIXTURES ----------
+
+@pytest_asyncio.fixture
+async def engine():
+    """Create test database engine."""
+    load_dotenv(dotenv_path=".env.test")
+    sql_url = os.getenv("SQLDB_URL")
+    engine = create_async_engine(
+        sql_url,
+        connect_args=(
+            {"check_same_thread": False} if sql_url.startswith("sqlite") else {}
+        ),
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    province_catalog.invalidate()
+
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session(engine):
+    """Create test database session."""
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def test_user(session):
+    """Create a user who selected a province."""
+    province = DBProvince(province_name="Nan", is_secondary=True)
+    session.add(province)
+    await session.commit()
+
+    user = DBUser(
+        email="test@example.com",
+        phone_number="1234567890",
+        username="testuser",
+        first_name="Test",
+        last_name="User",
+        roles=[],
+        selected_province_id=province.id,
+    )
+    user.set_password("testpassword")
+    session.add(user)
+    await session.commit()
+    return user
+
+
+@pytest_asyncio.fixture
+async def client(session, test_user):
+    """Create authenticated test client."""
+    async def get_session_override():
+        yield session
+
+    async def get_current_user_override():
+        return Principal.from_user(test_user)
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_active_user] = get_current_user_override
+
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+    app.dependency_overrides.clear()
+
+# ---------- TEST CASES ----------
+
+@pytest.mark.asyncio
+async def test_query_counts_per_endpoint(client, session, test_user):
+    session.expunge_all()
+
+    # A cold catalog reads the shared provinces version, then the rows.
+    with assert_query_count(2):
+        await client.get("/provinces/")
+
+    with assert_query_count(0):
+        await client.get("/provinces/")
+
+    with assert_query_count(0):
+        await client.get("/provinces/1")
+
+    with assert_query_count(1):
+        await client.get(f"/users/{test_user.id}/tax-info")
+
+
+@pytest.mark.asyncio
+async def test_assert_query_count_reports_statements(client):
+    with pytest.raises(AssertionError, match="Expected 0 SQL statements, got 2"):
+        with assert_query_count(0):
+            await client.get("/provinces/")
+
+
+def test_counter_budget_modes(caplog):
+    counter = QueryCounter(label="GET /x", budget=1, mode="log")
+    with caplog.at_level(logging.WARNING):
+        counter.record("SELECT 1")
+        counter.record("SELECT 1")
+    assert "exceeded its SQL budget" in caplog.text
+
+    counter = QueryCounter(label="GET /x", budget=1, mode="raise")
+    counter.record("SELECT 1")
+    with pytest.raises(QueryBudgetExceeded):
+        counter.record("SELECT 1")
+
+
+def test_counter_flags_repeated_statements(caplog):
+    counter = QueryCounter(label="GET /x", n_plus_one_threshold=3)
+    with caplog.at_level(logging.WARNING):
+        for _ in range(3):
+            counter.record("SELECT * FROM users WHERE id = ?")
+    assert "Possible N+1" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_route_budget_enforced_through_get_session(tmp_path, monkeypatch):
+    settings = config.get_settings()
+    monkeypatch.setattr(settings, "SQL_QUERY_BUDGETS", {"GET /provinces/": 0})
+    monkeypatch.setattr(settings, "SQL_QUERY_BUDGET_MODE", "raise")
+
+    await models.init_db(config.Settings(
+        SQLDB_URL=f"sqlite+aiosqlite:///{tmp_path / 'budget.db'}", SECRET_KEY="secret"
+    ))
+    province_catalog.invalidate()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            with pytest.raises(QueryBudgetExceeded):
+                await client.get("/provinces/")
+
+            with count_queries() as counter:
+                response = await client.get("/provinces/99")
+            assert response.status_code == 404
+            assert counter.count == 2
+    finally:
+        await models.close_db()
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import Column, Integer, MetaData, String, Table, event, inspect, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models.schema import (
+    SchemaMigrationError, bootstrap_schema, metadata_fingerprint, schema_version_table
+)
+
+
+def _metadata(*extra_columns):
+    metadata = MetaData()
+    Table(
+        "items",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String, nullable=False, index=True),
+        *extra_columns,
+    )
+    return metadata
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}")
+    yield engine
+    await engine.dispose()
+
+
+async def _version(engine):
+    async with engine.connect() as conn:
+        result = await conn.execute(select(schema_version_table.c.version))
+        return result.scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_creates_then_skips(engine):
+    metadata = _metadata()
+    assert await bootstrap_schema(engine, metadata) is True
+
+    async with engine.begin() as conn:
+        await conn.execute(text("INSERT INTO items (name) VALUES ('kept')"))
+
+    assert await bootstrap_schema(engine, metadata) is False
+    assert await _version(engine) == 1
+
+    async with engine.connect() as conn:
+        rows = (await conn.execute(text("SELECT name FROM items"))).all()
+    assert rows == [("kept",)]
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_adds_new_nullable_column(engine):
+    await bootstrap_schema(engine, _metadata())
+    async with engine.begin() as conn:
+        await conn.execute(text("INSERT INTO items (name) VALUES ('kept')"))
+
+    migrated = _metadata(Column("note", String, nullable=True, index=True))
+    assert await bootstrap_schema(engine, migrated) is True
+    assert await _version(engine) == 2
+
+    async with engine.connect() as conn:
+        columns = await conn.run_sync(
+            lambda c: {col["name"] for col in inspect(c).get_columns("items")}
+        )
+        indexes = await conn.run_sync(
+            lambda c: {idx["name"] for idx in inspect(c).get_indexes("items")}
+        )
+        rows = (await conn.execute(text("SELECT name, note FROM items"))).all()
+    assert "note" in columns
+    assert "ix_items_note" in indexes
+    assert rows == [("kept", None)]
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_rejects_non_additive_column(engine):
+    await bootstrap_schema(engine, _metadata())
+    with pytest.raises(SchemaMigrationError):
+        await bootstrap_schema(engine, _metadata(Column("code", String, nullable=False)))
+
+
+def test_fingerprint_changes_with_metadata():
+    assert metadata_fingerprint(_metadata()) == metadata_fingerprint(_metadata())
+    assert metadata_fingerprint(_metadata()) != metadata_fingerprint(
+        _metadata(Column("note", String))
+    )
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_survives_a_concurrent_first_bootstrap(engine):
+    raced = []
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def other_worker_inserts(conn, cursor, statement, parameters, context, executemany):
+        # Land another worker's row between this bootstrap's UPDATE and INSERT.
+        if statement.startswith("UPDATE schema_version") and not raced:
+            raced.append(statement)
+            conn.connection.cursor().execute(
+                "INSERT INTO schema_version (id, version, fingerprint, applied_at) "
+                "VALUES (1, 1, 'other', '2024-01-01 00:00:00')"
+            )
+
+    assert await bootstrap_schema(engine, _metadata()) is True
+    assert raced
+    assert await _version(engine) == 2
+    assert await bootstrap_schema(engine, _metadata()) is False
+
+
+@pytest.mark.asyncio
+async def test_concurrent_bootstraps_on_separate_engines(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'shared.db'}"
+    engines = [create_async_engine(url) for _ in range(4)]
+    try:
+        applied = await asyncio.gather(
+            *(bootstrap_schema(engine, _metadata()) for engine in engines)
+        )
+        assert applied.count(True) == 1
+        assert await _version(engines[0]) == 1
+    finally:
+        for engine in engines:
+            await engine.dispose()
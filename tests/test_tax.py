@@ -0,0 +1,184 @@
+import pytest
+import pytest_asyncio
+import httpx
+from httpx import AsyncClient
+from app.main import app
+from sqlmodel import SQLModel
+
+from app.models import get_session
+from app.models.province import DBProvince
+from app.core.catalog import ProvinceCatalog, province_catalog
+from app.core.deps import get_current_active_user
+from app.core.principals import Principal
+from app.core import config
+from app.core.config import TaxRules
+from app.core.tax import CompiledTaxRules, RateTable, get_rate_table, province_rate
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+import os
+from dotenv import load_dotenv
+
+# ---------- FIXTURES ----------
+
+@pytest_asyncio.fixture
+async def engine():
+    """Create test database engine."""
+    load_dotenv(dotenv_path=".env.test")
+    sql_url = os.getenv("SQLDB_URL")
+    engine = create_async_engine(
+        sql_url,
+        connect_args=(
+            {"check_same_thread": False} if sql_url.startswith("sqlite") else {}
+        ),
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    province_catalog.invalidate()
+
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session(engine):
+    """Create test database session."""
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def provinces(session):
+    """Create one primary and one secondary province."""
+    primary = DBProvince(province_name="Bangkok", is_secondary=False)
+    secondary = DBProvince(province_name="Nan", is_secondary=True)
+    session.add_all([primary, secondary])
+    await session.commit()
+    return primary, secondary
+
+
+@pytest_asyncio.fixture
+async def client(session):
+    """Create authenticated test client."""
+    async def get_session_override():
+        yield session
+
+    async def get_current_user_override():
+        return Principal(id=1, roles=())
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_active_user] = get_current_user_override
+
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+    app.dependency_overrides.clear()
+
+# ---------- TEST CASES ----------
+
+@pytest.mark.asyncio
+async def test_tax_quotes_in_input_order(client, provinces):
+    primary, secondary = provinces
+    items = [
+        {"province_id": secondary.id, "amount": 1000},
+        {"province_id": 999, "amount": 50},
+        {"province_id": primary.id, "amount": 2000},
+    ]
+    response = await client.post("/tax/quotes", json={"items": items})
+    assert response.status_code == 200
+    quotes = response.json()["quotes"]
+    assert [q["province_id"] for q in quotes] == [secondary.id, 999, primary.id]
+    assert quotes[0]["tax_reduction"] == 0.2
+    assert quotes[0]["reduction_amount"] == pytest.approx(200)
+    assert quotes[1]["tax_reduction"] is None
+    assert quotes[1]["reduction_amount"] is None
+    assert quotes[2]["reduction_amount"] == pytest.approx(200)
+
+
+@pytest.mark.asyncio
+async def test_tax_quotes_large_batch_single_load(client, provinces):
+    primary, secondary = provinces
+    items = [
+        {"province_id": (primary.id, secondary.id)[i % 2], "amount": float(i)}
+        for i in range(5000)
+    ]
+    loads = province_catalog.loads
+    response = await client.post("/tax/quotes", json={"items": items})
+    assert response.status_code == 200
+    assert len(response.json()["quotes"]) == 5000
+    assert province_catalog.loads == loads + 1
+
+
+@pytest.mark.asyncio
+async def test_fast_json_quotes_are_byte_identical(client, provinces, monkeypatch):
+    primary, secondary = provinces
+    items = [
+        {"province_id": secondary.id, "amount": 1000},
+        {"province_id": primary.id, "amount": 12.5},
+        {"province_id": 999, "amount": 0},
+    ]
+    monkeypatch.setattr(config.get_settings(), "FAST_JSON_RESPONSES", False)
+    slow = await client.post("/tax/quotes", json={"items": items})
+    monkeypatch.setattr(config.get_settings(), "FAST_JSON_RESPONSES", True)
+    fast = await client.post("/tax/quotes", json={"items": items})
+
+    assert fast.status_code == 200
+    assert fast.content == slow.content
+
+
+@pytest.mark.asyncio
+async def test_tax_quotes_rejects_empty_batch(client):
+    response = await client.post("/tax/quotes", json={"items": []})
+    assert response.status_code == 422
+
+
+def test_rate_table_rebuilds_on_catalog_write():
+    catalog = ProvinceCatalog()
+    catalog._index, catalog.shared_version = ({}, {}, ()), 0
+    table = RateTable.build(catalog)
+    assert table.rate(1) is None
+
+    catalog.put(DBProvince(id=1, province_name="Nan", is_secondary=True), 1)
+    table = RateTable.build(catalog)
+    assert table.rate(1) == 0.2
+    assert table.rate(-1) is None
+
+
+def test_compiled_rules_overrides_and_caps():
+    rules = CompiledTaxRules(TaxRules(
+        secondary_rate=0.3,
+        province_overrides={"Nan": 0.5, "Krabi": 0.05},
+        max_rate=0.4,
+        max_reduction_amount=100,
+    ))
+    assert rules.rate_for(DBProvince(province_name="Nan", is_secondary=True)) == 0.4
+    assert rules.rate_for(DBProvince(province_name="Krabi", is_secondary=True)) == 0.05
+    assert rules.rate_for(DBProvince(province_name="Phrae", is_secondary=True)) == 0.3
+    assert rules.rate_for(DBProvince(province_name="Bangkok", is_secondary=False)) == 0.1
+    assert rules.reduction_amount(0.3, 1000) == 100
+
+    catalog = ProvinceCatalog()
+    catalog._index, catalog.shared_version = ({}, {}, ()), 0
+    catalog.put(DBProvince(id=1, province_name="Nan", is_secondary=True), 1)
+    catalog.put(DBProvince(id=2, province_name="Bangkok", is_secondary=False), 2)
+    table = RateTable.build(catalog, rules)
+    rates, reductions = table.quote([1, 2], [1000, 200])
+    assert rates == [0.4, 0.1]
+    assert reductions == [100, pytest.approx(20)]
+
+
+@pytest.mark.asyncio
+async def test_province_rate_uses_rate_table(client, provinces):
+    primary, secondary = provinces
+    assert province_rate(secondary) == 0.2
+
+    await client.get("/provinces/")
+    table = get_rate_table()
+    response = await client.get(f"/provinces/{secondary.id}")
+    assert response.json()["tax_reduction"] == 0.2
+    assert get_rate_table() is table
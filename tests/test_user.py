@@ -1,3 +1,5 @@
+import asyncio
+from sqlalchemy.exc import OperationalError
 import pytest
 import pytest_asyncio
 import httpx
@@ -8,7 +10,15 @@ from sqlmodel import SQLModel
 from app.models import get_session
 from app.models.user_model import DBUser
 from app.models.province import DBProvince
-from app.core.deps import get_current_active_user
+from app.core import config
+from app.core.catalog import province_catalog
+from app.core import security
+from app.core.deps import get_current_active_user, get_current_user, get_token_payload
+from app.core.principals import Principal, PrincipalCache, principal_cache
+from app.core.query_budget import assert_query_count, count_queries
+from app.core.revocation import RevocationList
+from app.core.rate_limit import TokenBucketLimiter, login_throttle
+from app.core.last_login import LastLoginBuffer, last_login_buffer
 
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
@@ -16,6 +26,7 @@ from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 import datetime
+import time
 
 # ---------- FIXTURES ----------
 
@@ -34,6 +45,9 @@ async def engine():
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.drop_all)
         await conn.run_sync(SQLModel.metadata.create_all)
+    province_catalog.invalidate()
+    login_throttle.reset()
+    last_login_buffer.clear()
 
     yield engine
     await engine.dispose()
@@ -156,6 +170,67 @@ async def test_register_duplicate_phone(client, register_data, test_user):
     assert "Email or phone already registered" in response.json()["detail"]
 
 
+@pytest.mark.asyncio
+async def test_register_rejects_normalized_collisions(client, register_data, test_user):
+    register_data["email"] = "TEST@Example.com"
+    response = await client.post("/users/register", json=register_data)
+    assert response.status_code == 400
+    assert "Email or phone already registered" in response.json()["detail"]
+
+    register_data["email"] = "fresh@example.com"
+    register_data["phone_number"] = "123-456-7890"
+    response = await client.post("/users/register", json=register_data)
+    assert response.status_code == 400
+
+    register_data["phone_number"] = "0999999999"
+    register_data["username"] = "TestUser"
+    response = await client.post("/users/register", json=register_data)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already registered"
+
+
+@pytest.mark.asyncio
+async def test_update_rejects_another_users_identifier(authenticated_client, session, test_user):
+    other = DBUser(
+        email="taken@example.com",
+        phone_number="5555555555",
+        username="other",
+        first_name="Other",
+        last_name="User",
+        roles=[],
+    )
+    other.set_password("otherpassword")
+    session.add(other)
+    await session.commit()
+
+    response = await authenticated_client.put(f"/users/{test_user.id}", json={"email": "Taken@Example.com"})
+    assert response.status_code == 400
+    # Re-saving your own identifier in another case is not a collision.
+    response = await authenticated_client.put(f"/users/{test_user.id}", json={"username": "TESTUSER"})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_login_tries_every_user_sharing_an_identifier(client, session, test_user):
+    # Usernames are not unique, so two accounts can share one.
+    twin = DBUser(
+        email="twin@example.com",
+        phone_number="5555555556",
+        username="TESTUSER",
+        first_name="Twin",
+        last_name="User",
+        roles=[],
+    )
+    twin.set_password("twinpassword")
+    session.add(twin)
+    await session.commit()
+
+    for password, user_id in (("testpassword", test_user.id), ("twinpassword", twin.id)):
+        response = await client.post("/users/login", json={"identifier": "testuser", "password": password})
+        assert response.status_code == 200
+        assert response.json()["user_id"] == user_id
+
+
 @pytest.mark.asyncio
 async def test_login_success(client, login_data, test_user):
     response = await client.post("/users/login", json=login_data)
@@ -197,11 +272,36 @@ async def test_get_user_by_id(authenticated_client, test_user):
 @pytest.mark.asyncio
 async def test_update_user(authenticated_client, test_user):
     update_data = {"first_name": "Updated", "last_name": "Name"}
-    response = await authenticated_client.put(f"/users/{test_user.id}", json=update_data)
+    await authenticated_client.put(f"/users/{test_user.id}", json={"first_name": "Warm"})
+    # One UPDATE ... RETURNING plus the cache version bump once its row exists.
+    with assert_query_count(2):
+        response = await authenticated_client.put(f"/users/{test_user.id}", json=update_data)
     assert response.status_code == 200
     assert response.json()["first_name"] == "Updated"
 
 
+@pytest.mark.asyncio
+async def test_update_other_user_is_forbidden(authenticated_client, session, test_user):
+    other = DBUser(
+        email="other@example.com",
+        phone_number="5555555555",
+        username="other",
+        first_name="Other",
+        last_name="User",
+        roles=[],
+    )
+    other.set_password("otherpassword")
+    session.add(other)
+    await session.commit()
+
+    response = await authenticated_client.put(f"/users/{other.id}", json={"first_name": "Hijacked"})
+    assert response.status_code == 403
+    response = await authenticated_client.put("/users/99999", json={"first_name": "Ghost"})
+    assert response.status_code == 404
+    await session.refresh(other)
+    assert other.first_name == "Other"
+
+
 @pytest.mark.asyncio
 async def test_delete_user(authenticated_client, test_user):
     response = await authenticated_client.delete(f"/users/{test_user.id}")
@@ -213,21 +313,473 @@ async def test_get_user_tax_info(authenticated_client, test_user, test_province,
     test_user.selected_province_id = test_province.id
     session.add(test_user)
     await session.commit()
-    response = await authenticated_client.get(f"/users/{test_user.id}/tax-info")
+    session.expunge_all()
+    with assert_query_count(1):
+        response = await authenticated_client.get(f"/users/{test_user.id}/tax-info")
     assert response.status_code == 200
     assert response.json()["tax_reduction"] == 0.2
 
 
 @pytest.mark.asyncio
-async def test_select_province(authenticated_client, test_user, test_province):
-    response = await authenticated_client.put(
-        f"/users/{test_user.id}/select-province/{test_province.id}"
-    )
+async def test_user_embeds_selected_province(authenticated_client, test_user, test_province, session, monkeypatch):
+    test_user.selected_province_id = test_province.id
+    session.add(test_user)
+    await session.commit()
+    user_id = test_user.id
+    session.expunge_all()
+
+    with assert_query_count(1):
+        slow = await authenticated_client.get(f"/users/{user_id}")
+    assert slow.json()["selected_province"] == {
+        "province_name": test_province.province_name,
+        "is_secondary": test_province.is_secondary,
+        "id": test_province.id,
+    }
+    session.expunge_all()
+    monkeypatch.setattr(config.get_settings(), "FAST_JSON_RESPONSES", True)
+    fast = await authenticated_client.get(f"/users/{user_id}")
+    assert fast.content == slow.content
+
+    # A user returned by UPDATE ... RETURNING has no province loaded; the
+    # catalog fills it in instead of a lazy load.
+    session.expunge_all()
+    await province_catalog.load(session)
+    with count_queries() as counter:
+        response = await authenticated_client.put(f"/users/{user_id}", json={"first_name": "Again"})
+    assert response.status_code == 200
+    assert response.json()["selected_province"] == slow.json()["selected_province"]
+    assert not any("FROM provinces" in statement for statement in counter.statements)
+
+
+@pytest.mark.asyncio
+async def test_select_province(authenticated_client, session, test_user, test_province):
+    await province_catalog.load(session)
+    with assert_query_count(1):
+        response = await authenticated_client.put(
+            f"/users/{test_user.id}/select-province/{test_province.id}"
+        )
     assert response.status_code == 200
     assert "selected province" in response.json()["message"]
+    assert test_user.selected_province_id == test_province.id
 
 
 @pytest.mark.asyncio
 async def test_unauthenticated_access_to_protected_route(client):
     response = await client.get("/users/me")
     assert response.status_code in [401, 403]
+
+
+@pytest.mark.asyncio
+async def test_change_password(authenticated_client, test_user):
+    response = await authenticated_client.post(
+        f"/users/{test_user.id}/change-password",
+        json={"current_password": "testpassword", "new_password": "newpassword456"}
+    )
+    assert response.status_code == 200
+    assert await test_user.verify_password_async("newpassword456")
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_skips_user_lookup(session, test_user):
+    principal_cache.clear()
+    token = security.create_access_token({"sub": test_user.id})
+
+    payload = await get_token_payload(token)
+    principal = await get_current_user(payload, session)
+    assert principal.id == test_user.id
+    assert principal.roles == ()
+
+    await session.delete(test_user)
+    await session.commit()
+
+    cached = await get_current_user(payload, session)
+    assert cached is principal
+
+    principal_cache.invalidate(test_user.id)
+    with pytest.raises(Exception) as exc_info:
+        await get_current_user(payload, session)
+    assert exc_info.value.status_code == 401
+
+
+def test_principal_cache_lru_and_ttl():
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    for user_id in (1, 2, 3):
+        cache.put(Principal(id=user_id, roles=()))
+    assert cache.get(1) is None
+    assert cache.get(3).id == 3
+
+    expired = PrincipalCache(maxsize=2, ttl=0)
+    expired.put(Principal(id=1, roles=()))
+    assert expired.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_update_user_invalidates_principal(authenticated_client, test_user):
+    principal_cache.put(Principal.from_user(test_user))
+    response = await authenticated_client.put(
+        f"/users/{test_user.id}", json={"roles": ["admin"]}
+    )
+    assert response.status_code == 200
+    assert principal_cache.get(test_user.id) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("identifier", ["TEST@example.com", "testuser", "TestUser", "123-456-7890"])
+async def test_login_with_any_identifier(client, test_user, identifier):
+    response = await client.post(
+        "/users/login", json={"identifier": identifier, "password": "testpassword"}
+    )
+    assert response.status_code == 200
+    assert response.json()["user_id"] == test_user.id
+
+
+@pytest.mark.asyncio
+async def test_token_login_by_phone(client, test_user):
+    response = await client.post(
+        "/token", data={"username": test_user.phone_number, "password": "testpassword"}
+    )
+    assert response.status_code == 200
+    assert response.json()["user_id"] == test_user.id
+
+
+@pytest.mark.asyncio
+async def test_identifiers_follow_user_updates(authenticated_client, test_user):
+    await authenticated_client.put(f"/users/{test_user.id}", json={"email": "moved@example.com"})
+
+    response = await authenticated_client.post(
+        "/users/login", json={"identifier": "test@example.com", "password": "testpassword"}
+    )
+    assert response.status_code == 401
+
+    response = await authenticated_client.post(
+        "/users/login", json={"identifier": "moved@example.com", "password": "testpassword"}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_fast_json_user_is_byte_identical(authenticated_client, test_user, monkeypatch):
+    monkeypatch.setattr(config.get_settings(), "FAST_JSON_RESPONSES", False)
+    slow = await authenticated_client.get(f"/users/{test_user.id}")
+    monkeypatch.setattr(config.get_settings(), "FAST_JSON_RESPONSES", True)
+    fast = await authenticated_client.get(f"/users/{test_user.id}")
+
+    assert fast.status_code == 200
+    assert fast.content == slow.content
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_rotation(client, test_user):
+    response = await client.post(
+        "/token", data={"username": test_user.username, "password": "testpassword"}
+    )
+    first = response.json()
+
+    with assert_query_count(2):
+        response = await client.post("/token/refresh", json={"refresh_token": first["refresh_token"]})
+    assert response.status_code == 200
+    second = response.json()
+    assert second["user_id"] == test_user.id
+    assert second["refresh_token"] != first["refresh_token"]
+
+    response = await client.post("/token/refresh", json={"refresh_token": second["refresh_token"]})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_reuse_revokes_family(client, test_user):
+    response = await client.post(
+        "/token", data={"username": test_user.username, "password": "testpassword"}
+    )
+    first = response.json()
+    second = (await client.post("/token/refresh", json={"refresh_token": first["refresh_token"]})).json()
+
+    response = await client.post("/token/refresh", json={"refresh_token": first["refresh_token"]})
+    assert response.status_code == 401
+
+    response = await client.post("/token/refresh", json={"refresh_token": second["refresh_token"]})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_delete_user_revokes_refresh_tokens(authenticated_client, session, test_user):
+    tokens = (await authenticated_client.post(
+        "/token", data={"username": test_user.username, "password": "testpassword"}
+    )).json()
+    user_id = test_user.id
+    response = await authenticated_client.delete(f"/users/{user_id}")
+    assert response.status_code == 204
+
+    # SQLite may give the freed id to the next registration.
+    newcomer = DBUser(
+        id=user_id, email="mallory@example.com", phone_number="5550001111",
+        username="mallory", first_name="Mal", last_name="Lory", roles=[],
+    )
+    newcomer.set_password("malpassword")
+    session.add(newcomer)
+    await session.commit()
+
+    response = await authenticated_client.post(
+        "/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_rejected_for_missing_user(client, session, test_user):
+    tokens = (await client.post(
+        "/token", data={"username": test_user.username, "password": "testpassword"}
+    )).json()
+    await session.delete(test_user)
+    await session.commit()
+
+    response = await client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_rejects_access_token(client, test_user):
+    token = security.create_access_token({"sub": test_user.id})
+    response = await client.post("/token/refresh", json={"refresh_token": token})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_is_not_an_access_token(client, test_user):
+    token = security.create_refresh_token({"sub": str(test_user.id)})
+    response = await client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_access_and_refresh_tokens(client, test_user):
+    tokens = (await client.post(
+        "/token", data={"username": test_user.username, "password": "testpassword"}
+    )).json()
+    auth = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert (await client.get("/users/me", headers=auth)).status_code == 200
+
+    response = await client.post(
+        "/logout", headers=auth, json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 204
+
+    with assert_query_count(0):
+        response = await client.get("/users/me", headers=auth)
+    assert response.status_code == 401
+
+    response = await client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_admin_revoke_requires_admin(client, test_user):
+    tokens = (await client.post(
+        "/token", data={"username": test_user.username, "password": "testpassword"}
+    )).json()
+    auth = {"Authorization": f"Bearer {tokens['access_token']}"}
+    response = await client.post(
+        "/token/revoke", headers=auth, json={"token": tokens["access_token"]}
+    )
+    assert response.status_code == 403
+
+
+def test_revocation_list_prunes_expired_entries():
+    revocations = RevocationList()
+    now = time.time()
+    revocations.add("old", now - 1)
+    revocations.add("soon", now + 10)
+    revocations.add("later", now + 100)
+    assert not revocations.is_revoked("old")
+    assert revocations.is_revoked("soon")
+
+    revocations.prune(now + 50)
+    assert len(revocations) == 1
+    assert revocations.is_revoked("later")
+
+
+@pytest.mark.asyncio
+async def test_admin_revokes_token(client, session, test_user):
+    test_user.roles = ["admin"]
+    session.add(test_user)
+    await session.commit()
+    principal_cache.invalidate(test_user.id)
+
+    admin_token = security.create_access_token({"sub": test_user.id})
+    victim_token = security.create_access_token({"sub": test_user.id})
+    response = await client.post(
+        "/token/revoke",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        json={"token": victim_token},
+    )
+    assert response.status_code == 204
+
+    response = await client.get("/users/me", headers={"Authorization": f"Bearer {victim_token}"})
+    assert response.status_code == 401
+    response = await client.get("/users/me", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_login_throttled_per_identifier(client, test_user):
+    attempts = [
+        await client.post("/users/login", json={"identifier": "TestUser", "password": "wrong"})
+        for _ in range(6)
+    ]
+    assert [r.status_code for r in attempts[:5]] == [401] * 5
+    assert attempts[5].status_code == 429
+    assert int(attempts[5].headers["Retry-After"]) >= 1
+
+    with assert_query_count(0):
+        response = await client.post(
+            "/token", data={"username": "testuser", "password": "testpassword"}
+        )
+    assert response.status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_login_throttle_ignores_phone_formatting(client, test_user):
+    formats = ["123-456-7890", "123--456-7890", "(123) 456 7890", "123.456.7890", "1234567890", "123 4567890"]
+    statuses = [
+        (await client.post("/users/login", json={"identifier": phone, "password": "wrong"})).status_code
+        for phone in formats
+    ]
+    assert statuses == [401] * 5 + [429]
+
+
+def test_token_bucket_refills_and_evicts():
+    limiter = TokenBucketLimiter(capacity=2, refill_per_second=1, max_keys=2)
+    assert limiter.hit("a", now=0) == 0
+    assert limiter.hit("a", now=0) == 0
+    assert limiter.hit("a", now=0) == pytest.approx(1.0)
+    assert limiter.hit("a", now=1.0) == 0
+
+    limiter.hit("b", now=1.0)
+    limiter.hit("c", now=1.0)
+    assert len(limiter) == 2
+
+
+@pytest.mark.asyncio
+async def test_token_login_defers_last_login_date(client, session, test_user):
+    with assert_query_count(2):
+        response = await client.post(
+            "/token", data={"username": test_user.username, "password": "testpassword"}
+        )
+    assert response.status_code == 200
+    logged_in_at = last_login_buffer.pending(test_user.id)
+    assert logged_in_at is not None
+
+    assert await last_login_buffer.flush(session) == 1
+    assert last_login_buffer.pending(test_user.id) is None
+    await session.refresh(test_user)
+    assert test_user.last_login_date.replace(tzinfo=None) == logged_in_at.replace(tzinfo=None)
+
+
+@pytest.mark.asyncio
+async def test_last_login_buffer_flushes_when_full(engine, test_user):
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    buffer = LastLoginBuffer(interval=60, max_entries=2)
+    buffer.start(factory)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    buffer.record(test_user.id, now)
+    buffer.record(test_user.id + 1, now)
+    for _ in range(50):
+        if buffer.flushes:
+            break
+        await asyncio.sleep(0.01)
+    await buffer.stop()
+    assert buffer.stats() == {"pending": 0, "flushes": 1, "flushed_rows": 2, "failed_flushes": 0}
+
+
+@pytest.mark.asyncio
+async def test_last_login_buffer_keeps_batch_when_write_fails(session, test_user):
+    buffer = LastLoginBuffer(interval=60, max_entries=100)
+    earlier = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    later = earlier + datetime.timedelta(minutes=5)
+    buffer.record(test_user.id, earlier)
+    buffer.record(test_user.id + 1, earlier)
+
+    class LockedSession:
+        async def exec(self, statement, params=None):
+            # A login lands while the failing write is in flight.
+            buffer.record(test_user.id, later)
+            raise OperationalError("UPDATE users", {}, Exception("database is locked"))
+
+        async def rollback(self):
+            pass
+
+    with pytest.raises(OperationalError):
+        await buffer.flush(LockedSession())
+    assert buffer.pending(test_user.id) == later
+    assert buffer.pending(test_user.id + 1) == earlier
+    assert buffer.stats()["failed_flushes"] == 1
+
+    assert await buffer.flush(session) == 2
+    await session.refresh(test_user)
+    assert test_user.last_login_date.replace(tzinfo=None) == later.replace(tzinfo=None)
+
+
+@pytest_asyncio.fixture
+async def admin_client(client):
+    app.dependency_overrides[get_current_active_user] = lambda: Principal(id=999, roles=("admin",))
+    yield client
+    del app.dependency_overrides[get_current_active_user]
+
+
+@pytest_asyncio.fixture
+async def listed_users(session, test_province):
+    users = []
+    for i, roles in enumerate([["admin"], [], ["auditor", "admin"], []]):
+        user = DBUser(
+            email=f"listed{i}@example.com",
+            phone_number=f"77777777{i}",
+            username=f"listed{i}",
+            first_name="Listed",
+            last_name=str(i),
+            roles=roles,
+            hashed_password="x",
+            register_date=datetime.datetime(2024, 1, 1 + i),
+            selected_province_id=test_province.id if i % 2 else None,
+        )
+        session.add(user)
+        users.append(user)
+    await session.commit()
+    return users
+
+
+@pytest.mark.asyncio
+async def test_list_users_pages_by_id(admin_client, listed_users):
+    with assert_query_count(1) as counter:
+        response = await admin_client.get("/users/", params={"limit": 3})
+    assert response.status_code == 200
+    assert "hashed_password" not in "".join(counter.statements)
+    page = response.json()["users"]
+    assert [u["id"] for u in page] == [u.id for u in listed_users[:3]]
+    assert page[1]["selected_province"]["id"] == listed_users[1].selected_province_id
+    assert page[0]["selected_province"] is None
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = await admin_client.get("/users/", params={"limit": 3, "cursor": cursor})
+    assert [u["id"] for u in response.json()["users"]] == [listed_users[3].id]
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_list_users_filters(admin_client, listed_users, test_province):
+    async def ids(**params):
+        response = await admin_client.get("/users/", params=params)
+        assert response.status_code == 200
+        return [u["id"] for u in response.json()["users"]]
+
+    assert await ids(role="admin") == [listed_users[0].id, listed_users[2].id]
+    assert await ids(province_id=test_province.id) == [listed_users[1].id, listed_users[3].id]
+    assert await ids(registered_from="2024-01-02T00:00:00", registered_to="2024-01-04T00:00:00") == [
+        listed_users[1].id, listed_users[2].id
+    ]
+    assert (await admin_client.get("/users/", params={"role": "a%"})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_list_users_requires_admin(authenticated_client):
+    response = await authenticated_client.get("/users/")
+    assert response.status_code == 403